@@ -0,0 +1,503 @@
+import functools
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import distinct
+from filter_engine import ALL, filter_index
+from memo import filter_key
+
+# Perhitungan KPI dan data chart halaman dashboard, tanpa pemanggilan st.*.
+# Fungsi menerima dataset (atau frame yang sudah difilter) plus FilterSpec
+# opsional lewat spec=, dan mengembalikan hasil kecil (dict / frame ringkas)
+# sehingga bisa di-cache, di-benchmark dan dipakai ulang tanpa Streamlit:
+#
+#   spec = FilterSpec(region='West', start='2017-01-01', end='2017-12-31')
+#   executive_kpis(dataset, spec=spec)
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'Mei', 'Jun',
+               'Jul', 'Agu', 'Sep', 'Okt', 'Nov', 'Des']
+
+# Granularitas tren produk: label di UI -> frekuensi pandas Period
+TREND_FREQUENCIES = {'Bulanan': 'M', 'Mingguan': 'W', 'Harian': 'D'}
+
+# Kolom periode (awal bulan / minggu) per frekuensi; 'D' memakai full_date langsung
+PERIOD_COLUMNS = {'M': 'month_start', 'W': 'week_start', 'D': 'full_date'}
+
+STATE_CODES = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
+    'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
+    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
+    'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
+    'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
+    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
+    'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
+    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
+    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
+    'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
+    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
+    'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
+    'Wisconsin': 'WI', 'Wyoming': 'WY', 'District of Columbia': 'DC'
+}
+
+DISCOUNT_BINS = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 1.0]
+DISCOUNT_LABELS = ['0-10%', '10-20%', '20-30%', '30-40%', '40-50%', '50%+']
+
+# Kolom turunan yang dihitung sekali saat dataset dimuat (data_store.prepare_dataset)
+# dan dipakai bersama oleh semua halaman, bukan dihitung ulang per rerun.
+DERIVED_COLUMNS = {
+    'month_start': lambda df: df['full_date'].dt.to_period('M').dt.start_time,
+    'week_start': lambda df: df['full_date'].dt.to_period('W').dt.start_time,
+    # Nilai diskon unik (beberapa level saja) sebagai kode int8; bin apa pun
+    # dipetakan dari level, bukan dari tiap baris
+    'discount_level': lambda df: df['discount'].astype('category'),
+    'order_code': lambda df: distinct.encode(df['order_id']),
+    'customer_code': lambda df: distinct.encode(df['customer_id']),
+}
+
+# Kolom id -> kolom kode integer padat untuk distinct count (lihat distinct.py)
+DISTINCT_CODES = {'order_id': 'order_code', 'customer_id': 'customer_code'}
+
+
+_FilterSpec = namedtuple(
+    '_FilterSpec',
+    ['region', 'category', 'segment', 'start', 'end'],
+    defaults=(ALL, ALL, ALL, None, None)
+)
+
+
+class FilterSpec(_FilterSpec):
+    """Filter sidebar sebagai nilai biasa; 'Semua' / None berarti dimensi tidak difilter."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_date_range(cls, date_range, **dimensions):
+        """Spec dari st.date_input: rentang hanya dipakai bila kedua tanggal sudah dipilih."""
+        start = end = None
+        if date_range is not None and len(date_range) == 2:
+            start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+        return cls(start=start, end=end, **dimensions)
+
+    def key(self):
+        return filter_key(**self._asdict())
+
+    def apply(self, dataset):
+        return filter_index(dataset).select(**self._asdict())
+
+    def shifted(self, days):
+        return self._replace(
+            start=self.start - timedelta(days=days) if self.start is not None else None,
+            end=self.end - timedelta(days=days) if self.end is not None else None
+        )
+
+    def previous_period(self):
+        """Periode sepanjang rentang tanggal tepat sebelum start, atau None tanpa rentang."""
+        if self.start is None or self.end is None:
+            return None
+        delta = pd.Timestamp(self.end) - pd.Timestamp(self.start)
+        return self._replace(
+            start=pd.Timestamp(self.start) - delta - timedelta(days=1),
+            end=pd.Timestamp(self.start) - timedelta(days=1)
+        )
+
+    def rollup_filters(self):
+        """Argumen untuk fungsi baca di rollup.py."""
+        return dict(
+            region=self.region,
+            category=self.category,
+            segment=self.segment,
+            start_date=self.start,
+            end_date=self.end
+        )
+
+
+def derive_columns(df):
+    """Dataset + kolom turunan (DERIVED_COLUMNS)."""
+    return df.assign(**{name: compute(df) for name, compute in DERIVED_COLUMNS.items()})
+
+
+def derived(data, column):
+    """Kolom turunan dari dataset; dihitung di tempat hanya untuk frame di luar data_store."""
+    if column in data.columns:
+        return data[column]
+    return DERIVED_COLUMNS[column](data)
+
+
+def distinct_count(data, column):
+    """Jumlah nilai unik kolom id lewat kode integer, pengganti data[column].nunique()."""
+    return distinct.count_distinct(derived(data, DISTINCT_CODES[column]))
+
+
+def distinct_counts(data, by, columns):
+    """Jumlah nilai unik kolom-kolom id per grup `by` (grup kosong tidak ikut, seperti observed=True)."""
+    groups, uniques = pd.factorize(data[by], sort=True)
+    counts = pd.DataFrame({by: uniques})
+    for column in columns:
+        codes = derived(data, DISTINCT_CODES[column])
+        counts[column] = distinct.count_distinct_by(groups, codes, n_groups=len(uniques))
+    return counts
+
+
+def filtered(func):
+    """Terapkan spec= (FilterSpec) ke frame argumen pertama sebelum func dipanggil."""
+    @functools.wraps(func)
+    def wrapper(data, *args, spec=None, **kwargs):
+        if spec is not None:
+            data = spec.apply(data)
+        return func(data, *args, **kwargs)
+    return wrapper
+
+
+def calculate_change(current, previous):
+    if previous == 0:
+        return 0
+    return ((current - previous) / previous) * 100
+
+
+# -------------------------------
+# Eksekutif
+# -------------------------------
+@filtered
+def executive_kpis(data):
+    total_sales = data['sales'].sum()
+    total_transactions = distinct_count(data, 'order_id')
+    total_profit = data['profit'].sum()
+    return {
+        'total_sales': total_sales,
+        'total_transactions': total_transactions,
+        'total_profit': total_profit,
+        'avg_order_value': total_sales / total_transactions if total_transactions > 0 else 0,
+    }
+
+
+@filtered
+def monthly_sales(data):
+    month = derived(data, 'month_start').rename('full_date')
+    return data.groupby(month).agg({
+        'sales': 'sum',
+        'profit': 'sum'
+    }).reset_index()
+
+
+def profit_margin(monthly):
+    margin = monthly.rename(columns={'full_date': 'bulan'})
+    margin['profit_margin'] = ((margin['profit'] / margin['sales']) * 100).round(2)
+    return margin
+
+
+@filtered
+def region_summary(data):
+    summary = data.groupby('region', observed=True).agg({
+        'sales': 'sum',
+        'profit': 'sum',
+        'quantity': 'sum'
+    }).reset_index()
+    return summary.merge(distinct_counts(data, 'region', ['order_id', 'customer_id']), on='region')
+
+
+@filtered
+def state_summary(data, country='United States'):
+    data = data[data['country'] == country]
+    summary = data.groupby('state', observed=True).agg({
+        'sales': 'sum',
+        'profit': 'sum'
+    }).reset_index()
+    return summary.merge(distinct_counts(data, 'state', ['customer_id', 'order_id']), on='state')
+
+
+def state_margin(summary):
+    """Ringkasan state + profit_margin (%); frame asli tidak diubah."""
+    if summary.empty:
+        return summary
+    return summary.assign(profit_margin=(summary['profit'] / summary['sales'] * 100).round(2))
+
+
+def with_state_codes(summary):
+    """Ringkasan state + kode dua huruf untuk peta choropleth USA."""
+    return summary.assign(state_code=summary['state'].map(STATE_CODES))
+
+
+# -------------------------------
+# Operator
+# -------------------------------
+@filtered
+def operational_kpis(data):
+    return {
+        'total_orders': distinct_count(data, 'order_id'),
+        'total_products': data['product_name'].nunique(),
+    }
+
+
+@filtered
+def product_ranking(data, n=10, bottom=False):
+    return (
+        data.groupby('product_name', observed=True)['sales']
+        .sum()
+        .sort_values(ascending=bottom)
+        .head(n)
+        .reset_index()
+    )
+
+
+@filtered
+def region_sales(data):
+    sales = data.groupby('region', observed=True)['sales'].sum().reset_index()
+    sales['sales'] = sales['sales'].round().astype(int)
+    return sales
+
+
+@filtered
+def ship_mode_counts(data):
+    counts = data.groupby('ship_mode', observed=True).size()
+    return counts.rename('total').reset_index()
+
+
+@filtered
+def category_sales(data):
+    return (
+        data.groupby('category', observed=True)['sales']
+        .sum()
+        .reset_index()
+        .sort_values(by='sales', ascending=False)
+    )
+
+
+@filtered
+def product_trends(data, n=10, freq='M'):
+    """Pivot (periode x produk) penjualan top-n produk, dihitung dalam satu groupby.
+    Kolom terurut dari produk dengan total penjualan terbesar; periode tanpa
+    transaksi bernilai NaN."""
+    totals = data.groupby('product_name', observed=True)['sales'].sum()
+    top_products = totals.nlargest(n).index
+    subset = data[data['product_name'].isin(top_products)]
+
+    period = derived(subset, PERIOD_COLUMNS[freq]).rename('full_date')
+    trends = (
+        subset.groupby([period, subset['product_name']], observed=True)['sales']
+        .sum()
+        .unstack('product_name')
+    )
+    return trends.reindex(columns=top_products)
+
+
+# -------------------------------
+# Analitik
+# -------------------------------
+# Metrik customer diturunkan dari satu tabel ringkas per customer (customer_summary),
+# dibuat dengan satu groupby per periode. Fungsi di bawah menerima customers=
+# hasil customer_summary supaya halaman cukup membangunnya sekali.
+@filtered
+def per_customer(data, **aggregations):
+    """Agregasi per customer (dikelompokkan lewat customer_code) + kolom orders (order unik)."""
+    customer = derived(data, 'customer_code').to_numpy()
+    summary = data.groupby(customer, sort=False).agg(customer_id=('customer_id', 'first'), **aggregations)
+    orders = distinct.count_distinct_by(customer, derived(data, 'order_code'))
+    summary.insert(1, 'orders', orders[summary.index.to_numpy(dtype=np.int64)])
+    return summary.reset_index(drop=True)
+
+
+def customer_summary(data):
+    """Satu baris per customer: orders, sales, first_date, last_date."""
+    return per_customer(
+        data,
+        sales=('sales', 'sum'),
+        first_date=('full_date', 'min'),
+        last_date=('full_date', 'max'),
+    )
+
+
+def conversion_rate(customers):
+    unique_customers = len(customers)
+    if unique_customers == 0:
+        return 0
+    estimated_visitors = unique_customers * (customers['orders'].mean() + 2)
+    return min((unique_customers / estimated_visitors) * 100, 100)
+
+
+def churn_rate(customers, days=90):
+    """% customer yang transaksi terakhirnya > days hari sebelum transaksi terakhir periode."""
+    if customers.empty:
+        return 0
+    churn_threshold = customers['last_date'].max() - timedelta(days=days)
+    return (customers['last_date'] < churn_threshold).mean() * 100
+
+
+@filtered
+def calculate_conversion_rate(data):
+    return conversion_rate(customer_summary(data))
+
+
+@filtered
+def calculate_churn_rate(data):
+    return churn_rate(customer_summary(data))
+
+
+@filtered
+def analytics_kpis(data, customers=None):
+    if customers is None:
+        customers = customer_summary(data)
+    return {
+        'avg_discount': data['discount'].mean() * 100,
+        'conversion_rate': conversion_rate(customers),
+        'customer_ltv': customers['sales'].mean(),
+        'churn_rate': churn_rate(customers),
+    }
+
+
+def discount_labels(edges):
+    """Label bin dari batas diskon (pecahan), mis. [0, 0.1, 1.0] -> ['0-10%', '10%+']."""
+    labels = [f'{low * 100:g}-{high * 100:g}%' for low, high in zip(edges[:-1], edges[1:])]
+    if edges[-1] >= 1:
+        labels[-1] = f'{edges[-2] * 100:g}%+'
+    return labels
+
+
+def discount_bins(data, edges=DISCOUNT_BINS):
+    """Kode bin per baris (-1 di luar bin), interval (kiri, kanan] seperti pd.cut."""
+    levels = derived(data, 'discount_level')
+    values = levels.cat.categories.to_numpy(dtype=np.float64)
+    level_bins = np.searchsorted(np.asarray(edges, dtype=np.float64), values, side='left') - 1
+    level_bins[(level_bins < 0) | (level_bins >= len(edges) - 1)] = -1
+    # Kode -1 (diskon kosong) mengambil elemen terakhir, yaitu -1
+    return np.append(level_bins, -1)[levels.cat.codes.to_numpy()]
+
+
+def _binned_sum(bins, values, n_bins):
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    total = np.bincount(bins, weights=np.where(present, values, 0), minlength=n_bins)
+    count = np.bincount(bins, weights=present, minlength=n_bins)
+    return total, count
+
+
+@filtered
+def discount_effectiveness(data, edges=DISCOUNT_BINS, labels=None):
+    """Sales/profit/quantity/order per bin diskon dalam satu pass bincount; bin kosong tetap tampil."""
+    if labels is None:
+        labels = DISCOUNT_LABELS if list(edges) == DISCOUNT_BINS else discount_labels(edges)
+    n_bins = len(edges) - 1
+
+    bins = discount_bins(data, edges)
+    inside = bins >= 0
+    bins = bins[inside]
+    sales, sales_count = _binned_sum(bins, data['sales'].to_numpy()[inside], n_bins)
+    profit, profit_count = _binned_sum(bins, data['profit'].to_numpy()[inside], n_bins)
+    quantity, _ = _binned_sum(bins, data['quantity'].to_numpy(dtype=np.float64, na_value=np.nan)[inside], n_bins)
+    orders = np.bincount(bins[data['order_id'].notna().to_numpy()[inside]], minlength=n_bins)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        analysis = pd.DataFrame({
+            'discount_range': pd.Categorical(labels, categories=labels, ordered=True),
+            'total_sales': sales,
+            'avg_sales': sales / sales_count,
+            'total_profit': profit,
+            'avg_profit': profit / profit_count,
+            'total_qty': quantity.astype(np.int64),
+            'total_orders': orders,
+        }).round(2)
+        analysis['profit_margin'] = analysis['total_profit'] / analysis['total_sales'] * 100
+    return analysis
+
+
+@filtered
+def segment_summary(data):
+    summary = data.groupby('segment', observed=True).agg({
+        'sales': 'sum'
+    }).reset_index()
+    return summary.merge(distinct_counts(data, 'segment', ['customer_id']), on='segment')
+
+
+@filtered
+def seasonal_pattern(data):
+    seasonal = data.groupby(data['full_date'].dt.month).agg({
+        'sales': 'sum',
+        'quantity': 'sum'
+    }).reset_index()
+    seasonal['month_name'] = seasonal['full_date'].apply(lambda x: MONTH_NAMES[x - 1])
+    return seasonal
+
+
+@filtered
+def purchase_frequency(data, customers=None):
+    if customers is None:
+        customers = customer_summary(data)
+    return customers[['customer_id', 'orders']].rename(columns={'orders': 'frequency'})
+
+
+@filtered
+def detail_metrics(data, customers=None):
+    """Angka pada expander "Detail Metrics" halaman analitik."""
+    if customers is None:
+        customers = customer_summary(data)
+    max_date = customers['last_date'].max()
+    active_threshold = max_date - timedelta(days=30)
+    return {
+        'total_customers': len(customers),
+        'total_orders': int(customers['orders'].sum()),
+        'avg_frequency': customers['orders'].mean(),
+        'repeat_customers': int((customers['orders'] > 1).sum()),
+        'period_days': (max_date - customers['first_date'].min()).days,
+        'active_customers': int((customers['last_date'] >= active_threshold).sum()),
+    }
+
+
+# ================================
+# Aktivitas customer lifetime & RFM
+# ================================
+# Kolom sama dengan tabel customer_activity (lihat customer_activity.py), jadi
+# churn_rate()/rfm_segments() bisa membaca tabel ETL maupun hasil fungsi ini.
+RFM_SEGMENTS = ['Champions', 'Loyal', 'Potensial', 'Perlu Perhatian', 'Berisiko', 'Hilang']
+
+
+def lifetime_activity(data):
+    """Fallback customer_activity dari dataset: satu baris per customer sepanjang riwayat."""
+    return per_customer(
+        data,
+        segment=('segment', 'first'),
+        sales=('sales', 'sum'),
+        profit=('profit', 'sum'),
+        first_date=('full_date', 'min'),
+        last_date=('full_date', 'max'),
+    )
+
+
+def rfm_scores(customers):
+    """Skor recency/frequency/monetary 1-5 (kuintil) per customer."""
+    recency = (customers['last_date'].max() - customers['last_date']).dt.days
+
+    def score(values):
+        # rank dulu supaya nilai kembar tidak membuat kuintil kosong
+        return np.ceil(values.rank(method='first', pct=True) * 5).astype(int)
+
+    return customers.assign(
+        recency_days=recency,
+        r_score=score(-recency),
+        f_score=score(customers['orders']),
+        m_score=score(customers['sales']),
+    )
+
+
+def rfm_segments(customers):
+    """Jumlah customer dan sales per segmen RFM, urut sesuai RFM_SEGMENTS."""
+    if customers.empty:
+        return pd.DataFrame(columns=['rfm_segment', 'customers', 'sales', 'avg_recency_days'])
+
+    scored = rfm_scores(customers)
+    r, fm = scored['r_score'], (scored['f_score'] + scored['m_score']) / 2
+    labels = np.select(
+        [(r >= 4) & (fm >= 4), (r >= 3) & (fm >= 3), r >= 4, r == 3, fm >= 3],
+        RFM_SEGMENTS[:5],
+        default=RFM_SEGMENTS[5],
+    )
+    summary = scored.assign(
+        rfm_segment=pd.Categorical(labels, categories=RFM_SEGMENTS)
+    ).groupby('rfm_segment', observed=False).agg(
+        customers=('customer_id', 'size'),
+        sales=('sales', 'sum'),
+        avg_recency_days=('recency_days', 'mean'),
+    )
+    return summary.reset_index()
+
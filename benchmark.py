@@ -0,0 +1,353 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import psutil
+
+import analytics
+import forecast
+from data_store import prepare_dataset
+from etl_script.load import TABLES, FrameReader
+from etl_script.transform import SalesTransformer, iter_tables
+from filter_engine import FilterIndex
+from snapshot import read_snapshot, write_snapshot
+
+# Benchmark yang bisa diulang untuk ETL, load dataset, jalur filter + KPI tiap
+# halaman dan forecast stok. Data sintetis berbentuk sales.csv dibuat dari
+# anggota dimensi dataset/sales.csv. Tanpa --postgres, tabel hasil transform
+# ditulis ke file CSV (payload yang sama dengan COPY) dan dataset dibaca lewat
+# snapshot Arrow, jadi tidak butuh database.
+#
+#   python benchmark.py --sizes 10k 1m --output bench/HEAD.json
+#   python benchmark.py --sizes 10k 1m --output bench/new.json --compare bench/HEAD.json
+
+TEMPLATE_CSV = os.path.join('dataset', 'sales.csv')
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+GENERATE_CHUNK_ROWS = 500_000
+
+CUSTOMER_COLUMNS = ['Customer ID', 'Customer Name', 'Segment', 'Country', 'City', 'State',
+                    'Postal Code', 'Region', 'Latitude', 'Longitude']
+PRODUCT_COLUMNS = ['Product ID', 'Category', 'Sub-Category', 'Product Name']
+SHIP_MODES = ['Standard Class', 'Second Class', 'First Class', 'Same Day']
+DISCOUNTS = [0.0, 0.0, 0.0, 0.1, 0.2, 0.2, 0.3, 0.4, 0.5, 0.7, 0.8]
+
+# Filter yang dipakai untuk jalur halaman (kombinasi yang umum dipilih user)
+PAGE_FILTERS = {'region': 'West', 'category': 'Technology', 'segment': 'Consumer'}
+
+
+def parse_size(value):
+    value = value.lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def generate_sales_csv(path, rows, template=TEMPLATE_CSV, seed=42):
+    """Tulis CSV sintetis berkolom sama dengan sales.csv, per chunk supaya memori tetap kecil."""
+    source = pd.read_csv(template)
+    customers = source[CUSTOMER_COLUMNS].drop_duplicates('Customer ID').reset_index(drop=True)
+    products = source[PRODUCT_COLUMNS].drop_duplicates('Product ID').reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    first_day = pd.Timestamp('2014-01-01')
+    days = (pd.Timestamp('2017-12-31') - first_day).days + 1
+
+    written = 0
+    with open(path, 'w', newline='') as f:
+        while written < rows:
+            n = min(GENERATE_CHUNK_ROWS, rows - written)
+            row_ids = np.arange(written + 1, written + n + 1)
+            order_dates = first_day + pd.to_timedelta(np.sort(rng.integers(0, days, n)), unit='D')
+            ship_dates = order_dates + pd.to_timedelta(rng.integers(0, 8, n), unit='D')
+            customer = customers.iloc[rng.integers(0, len(customers), n)].reset_index(drop=True)
+            product = products.iloc[rng.integers(0, len(products), n)].reset_index(drop=True)
+            sales = np.round(rng.lognormal(4.0, 1.2, n), 2)
+            discount = rng.choice(DISCOUNTS, n)
+
+            chunk = pd.DataFrame({
+                'Row ID': row_ids,
+                'Order ID': [f'SY-{i:010d}' for i in row_ids],
+                'Order Date': order_dates.strftime('%-m/%-d/%Y'),
+                'Ship Date': ship_dates.strftime('%-m/%-d/%Y'),
+                'Ship Mode': rng.choice(SHIP_MODES, n),
+            })
+            chunk = pd.concat([chunk, customer, product], axis=1)
+            chunk['Sales'] = sales
+            chunk['Quantity'] = rng.integers(1, 15, n)
+            chunk['Discount'] = discount
+            chunk['Profit'] = np.round(sales * (0.3 - discount) * rng.uniform(0.5, 1.5, n), 4)
+            chunk['Stock'] = rng.integers(0, 1000, n).astype('float64')
+            chunk = chunk[source.columns]
+            chunk.to_csv(f, index=False, header=(written == 0))
+            written += n
+    return path
+
+
+class PeakRss:
+    """Sampling RSS proses di thread terpisah; .peak = RSS maksimum selama blok."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self.stopped = threading.Event()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+@contextmanager
+def stage(results, name, rows):
+    """Catat durasi, throughput dan peak RSS satu tahap ke results[name]."""
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - started
+    results[name] = {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_second': round(rows / seconds) if seconds > 0 else None,
+        'peak_rss_mb': round(rss.peak / 1024 ** 2, 1),
+    }
+    print(f"  {name:<28}{seconds:>10.3f}s{results[name]['peak_rss_mb']:>10.1f} MB")
+
+
+def transform_to_files(csv_path, workdir):
+    """ETL tanpa database: transform per chunk, payload COPY ditulis ke <tabel>.csv."""
+    transformer = SalesTransformer()
+    files = {table: open(os.path.join(workdir, f'{table}.csv'), 'w') for table, _, _, _ in TABLES}
+    try:
+        for tables in iter_tables(csv_path, transformer):
+            for table, columns, _, _ in TABLES:
+                frame = tables[table]
+                if not frame.empty:
+                    files[table].write(FrameReader(frame[columns]).read())
+    finally:
+        for f in files.values():
+            f.close()
+    return transformer
+
+
+def read_loaded_tables(workdir):
+    """Baca tabel hasil 'load' berbasis file, dengan dedup per key seperti merge ON CONFLICT."""
+    tables = {}
+    for table, columns, conflict, _ in TABLES:
+        frame = pd.read_csv(os.path.join(workdir, f'{table}.csv'), names=columns)
+        tables[table] = frame.drop_duplicates(conflict)
+    return tables
+
+
+def join_dataset(tables):
+    """Padanan pandas untuk data_store.MAIN_QUERY."""
+    df = tables['fact_sales']
+    df = df.merge(tables['dim_customer'], on='customer_id', how='left')
+    df = df.merge(tables['dim_location'], on='location_key', how='left')
+    df = df.merge(tables['dim_product'], on='product_id', how='left')
+    df = df.merge(tables['dim_date'], left_on='order_date_key', right_on='date_key', how='left')
+    df = df.merge(tables['dim_ship_mode'], on='ship_mode_key', how='left')
+    df['full_date'] = pd.to_datetime(df['full_date'])
+    return df.drop(columns=['location_key', 'date_key', 'postal_code'])
+
+
+def run_postgres_load(csv_path):
+    """Load sungguhan ke DATABASE_URL (tabel dikosongkan!) lalu baca dataset dari database."""
+    from data_store import load_from_database
+    from database import get_connection
+    from etl_script.load import load_tables
+    from etl_script.schema import create_tables
+
+    transformer = SalesTransformer()
+    with get_connection() as conn:
+        with conn.begin():
+            create_tables(conn)
+            load_tables(conn.connection, iter_tables(csv_path, transformer), truncate=True)
+    return load_from_database()
+
+
+def page_paths(dataset):
+    """Jalur filter + KPI/chart data per halaman, tanpa Streamlit."""
+    end = dataset['full_date'].max()
+    start = end - pd.Timedelta(days=365)
+
+    def eksekutif():
+        spec = analytics.FilterSpec(start=start, end=end, **PAGE_FILTERS)
+        data = spec.apply(dataset)
+        analytics.executive_kpis(data)
+        analytics.executive_kpis(dataset, spec=spec.previous_period())
+        analytics.monthly_sales(data)
+        analytics.region_summary(data)
+        analytics.state_margin(analytics.state_summary(data))
+
+    def operator():
+        spec = analytics.FilterSpec(start=start, end=end, region=PAGE_FILTERS['region'], category=PAGE_FILTERS['category'])
+        data = spec.apply(dataset)
+        analytics.operational_kpis(data)
+        analytics.operational_kpis(dataset, spec=spec.shifted(days=7))
+        analytics.product_ranking(data)
+        analytics.region_sales(data)
+        analytics.ship_mode_counts(data)
+        analytics.category_sales(data)
+        analytics.product_trends(data, n=100, freq='W')
+
+    def analitik():
+        spec = analytics.FilterSpec(start=start, end=end, segment=PAGE_FILTERS['segment'])
+        data = spec.apply(dataset)
+        customers = analytics.customer_summary(data)
+        analytics.analytics_kpis(data, customers=customers)
+        analytics.analytics_kpis(dataset, spec=spec.previous_period())
+        analytics.detail_metrics(data, customers=customers)
+        analytics.discount_effectiveness(data)
+        analytics.segment_summary(data)
+        analytics.seasonal_pattern(data)
+        analytics.purchase_frequency(data, customers=customers)
+
+    return {'eksekutif': eksekutif, 'operator': operator, 'analitik': analitik}
+
+
+def monthly_products(dataset):
+    """Padanan pandas untuk forecast.MONTHLY_PRODUCT_QUERY."""
+    month = analytics.derived(dataset, 'month_start').rename('bulan')
+    monthly = dataset.groupby(['product_id', 'product_name', month], observed=True).agg(
+        total_penjualan=('sales', 'sum'),
+        rata_rata_stok=('quantity', 'mean'),
+    )
+    return monthly.reset_index()
+
+
+def run_size(rows, workdir, postgres=False, keep_csv=False):
+    results = {}
+    csv_path = os.path.join(workdir, f'sales_{rows}.csv')
+    print(f"{rows:,} baris")
+
+    if not os.path.exists(csv_path):
+        with stage(results, 'generate_csv', rows):
+            generate_sales_csv(csv_path, rows)
+
+    if postgres:
+        with stage(results, 'etl_load_postgres', rows):
+            raw = run_postgres_load(csv_path)
+    else:
+        with stage(results, 'etl_transform_load', rows):
+            transform_to_files(csv_path, workdir)
+        with stage(results, 'etl_join', rows):
+            raw = join_dataset(read_loaded_tables(workdir))
+
+    snapshot_path = os.path.join(workdir, 'snapshot.arrow')
+    with stage(results, 'snapshot_write', len(raw)):
+        write_snapshot(raw, 'benchmark', snapshot_path)
+    del raw
+
+    with stage(results, 'load_data', rows):
+        dataset, _, _ = prepare_dataset(read_snapshot(snapshot_path, check_watermark=False))
+
+    with stage(results, 'filter_index', len(dataset)):
+        FilterIndex(dataset)
+    for page, run in page_paths(dataset).items():
+        with stage(results, f'page_{page}', len(dataset)):
+            run()
+
+    # Forecast selalu diukur dengan training dari nol: model tersimpan dari run
+    # sebelumnya (file maupun cache proses) dibuang dulu
+    monthly = monthly_products(dataset)
+    model_path = os.path.join(workdir, f'model_{rows}.joblib')
+    if os.path.exists(model_path):
+        os.remove(model_path)
+    forecast._bundles.pop(model_path, None)
+    features = forecast.build_features(monthly)
+    if not features.empty:
+        with stage(results, 'forecast_train', len(features)):
+            forecast.train_model(features)
+        with stage(results, 'forecast_evaluate', len(monthly)):
+            forecast.evaluate_model(monthly)
+    with stage(results, 'stock_forecast', len(monthly)):
+        forecast.forecast_stock(monthly, path=model_path)
+    results['stock_forecast']['trained'] = os.path.exists(model_path)
+
+    if not keep_csv:
+        os.remove(csv_path)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """Cetak rasio waktu current/baseline per (ukuran, tahap); < 1 berarti lebih cepat."""
+    print(f"\nPerbandingan dengan {baseline.get('commit')}:")
+    print(f"{'Ukuran':>10}  {'Tahap':<28}{'Baseline':>10}{'Sekarang':>10}{'Rasio':>8}")
+    for size, stages in current['results'].items():
+        base_stages = baseline['results'].get(size, {})
+        for name, result in stages.items():
+            base = base_stages.get(name)
+            if base is None:
+                continue
+            ratio = result['seconds'] / base['seconds'] if base['seconds'] else float('nan')
+            print(f"{size:>10}  {name:<28}{base['seconds']:>10.3f}{result['seconds']:>10.3f}{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ETL, load dataset, jalur halaman dan forecast")
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1m'], help="Jumlah baris: 10k, 100k, 1m, 10m atau angka")
+    parser.add_argument('--output', default='benchmark_results.json', help="File JSON hasil")
+    parser.add_argument('--compare', help="File JSON hasil lama untuk dibandingkan")
+    parser.add_argument('--workdir', help="Direktori kerja (default: direktori sementara)")
+    parser.add_argument('--keep-csv', action='store_true', help="Simpan CSV sintetis untuk run berikutnya")
+    parser.add_argument('--postgres', action='store_true',
+                        help="Load ke DATABASE_URL sungguhan (MENGOSONGKAN tabel; hanya untuk database uji)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='dashboard_bench_')
+    os.makedirs(workdir, exist_ok=True)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': pd.Timestamp.now().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'backend': 'postgres' if args.postgres else 'file',
+        'results': {},
+    }
+    for size in args.sizes:
+        rows = parse_size(size)
+        report['results'][str(rows)] = run_size(rows, workdir, args.postgres, args.keep_csv)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nHasil ditulis ke {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import threading
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+import data_store
+from database import get_connection, get_engine
+
+# Ringkasan aktivitas per customer (first/last order, jumlah order, sales/profit
+# lifetime), dipelihara oleh ETL. Metrik churn/recency dan segmentasi RFM membaca
+# tabel ini, yang ukurannya sebanding jumlah customer, bukan jumlah transaksi.
+# Load incremental hanya menghitung ulang customer yang tersentuh load tersebut.
+
+CREATE_CUSTOMER_ACTIVITY = """
+CREATE TABLE IF NOT EXISTS customer_activity (
+    customer_id TEXT PRIMARY KEY,
+    segment TEXT,
+    location_key INT,
+    first_order_date DATE,
+    last_order_date DATE,
+    order_count BIGINT,
+    lifetime_sales NUMERIC,
+    lifetime_profit NUMERIC,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+)
+"""
+
+UPSERT_ACTIVITY = """
+INSERT INTO customer_activity (
+    customer_id, segment, location_key, first_order_date, last_order_date,
+    order_count, lifetime_sales, lifetime_profit, updated_at
+)
+SELECT
+    fs.customer_id, dc.segment, dc.location_key,
+    MIN(dd.full_date), MAX(dd.full_date),
+    COUNT(DISTINCT fs.order_id), SUM(fs.sales), SUM(fs.profit), now()
+FROM fact_sales fs
+LEFT JOIN dim_customer dc ON fs.customer_id = dc.customer_id
+LEFT JOIN dim_date dd ON fs.order_date_key = dd.date_key
+{where}
+GROUP BY fs.customer_id, dc.segment, dc.location_key
+ON CONFLICT (customer_id) DO UPDATE SET
+    segment = EXCLUDED.segment,
+    location_key = EXCLUDED.location_key,
+    first_order_date = EXCLUDED.first_order_date,
+    last_order_date = EXCLUDED.last_order_date,
+    order_count = EXCLUDED.order_count,
+    lifetime_sales = EXCLUDED.lifetime_sales,
+    lifetime_profit = EXCLUDED.lifetime_profit,
+    updated_at = EXCLUDED.updated_at
+"""
+
+# Nama kolom disamakan dengan analytics.customer_summary()
+SELECT_ACTIVITY = """
+SELECT customer_id, segment, location_key,
+       first_order_date AS first_date, last_order_date AS last_date,
+       order_count AS orders, lifetime_sales AS sales, lifetime_profit AS profit
+FROM customer_activity
+"""
+
+_lock = threading.Lock()
+_cache = {'version': None, 'frame': None}
+
+
+def create_customer_activity_table(conn):
+    conn.execute(text(CREATE_CUSTOMER_ACTIVITY))
+
+
+def refresh_customer_activity(conn, customer_ids=None):
+    """Hitung ulang aktivitas customer tertentu, atau seluruhnya bila customer_ids None."""
+    create_customer_activity_table(conn)
+    if customer_ids is None:
+        conn.execute(text("TRUNCATE TABLE customer_activity"))
+        conn.execute(text(UPSERT_ACTIVITY.format(where="")))
+        return
+
+    customer_ids = sorted(customer_ids)
+    if not customer_ids:
+        return
+    conn.execute(
+        text(UPSERT_ACTIVITY.format(where="WHERE fs.customer_id = ANY(:customer_ids)")),
+        {'customer_ids': customer_ids}
+    )
+
+
+def load_customer_activity():
+    """Tabel aktivitas di memori, dimuat ulang setiap kali versi dataset bersama berganti."""
+    version = data_store.get_version()
+    with _lock:
+        if _cache['version'] == version and version is not None:
+            return _cache['frame']
+        try:
+            with get_connection() as conn:
+                frame = pd.read_sql(SELECT_ACTIVITY, conn)
+            frame['first_date'] = pd.to_datetime(frame['first_date'])
+            frame['last_date'] = pd.to_datetime(frame['last_date'])
+            for col in ['sales', 'profit']:
+                frame[col] = frame[col].astype(float)
+        except SQLAlchemyError:
+            # Tabel belum dibuat ETL: halaman kembali ke ringkasan dari dataset
+            frame = None
+        _cache['version'] = version
+        _cache['frame'] = frame
+        return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun ulang tabel customer_activity dari fact_sales")
+    parser.parse_args()
+
+    with get_engine().begin() as conn:
+        refresh_customer_activity(conn)
+    print("Tabel customer_activity berhasil dibangun ulang")
+
+
+if __name__ == '__main__':
+    main()
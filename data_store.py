@@ -0,0 +1,220 @@
+import logging
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from analytics import derive_columns
+from database import get_connection
+from snapshot import read_snapshot
+
+# Dataset penjualan dibagi ke semua session dan semua halaman dalam satu proses.
+# Frame yang dikembalikan get_dataset() diperlakukan read-only: kolom turunan
+# (periode, level diskon, kode id) sudah dihitung saat load. Halaman tidak boleh
+# menulis atau menambah kolom; pakai assign() / copy bila perlu. freeze() menandai
+# array kolom tidak bisa ditulis sebagai pengaman tambahan (best-effort), bukan jaminan.
+
+DATA_TTL_SECONDS = int(os.environ.get("DASHBOARD_DATA_TTL", "3600"))
+
+MAIN_QUERY = """
+SELECT
+    fs.*,
+    dl.country, dl.city, dl.state, dl.region, dl.latitude, dl.longitude,
+    dp.product_name, dp.category, dp.sub_category,
+    dc.customer_name, dc.segment,
+    dd.full_date, dd.day_of_week, dd.month, dd.quarter, dd.year,
+    dsm.ship_mode
+FROM fact_sales fs
+LEFT JOIN dim_customer dc ON fs.customer_id = dc.customer_id
+LEFT JOIN dim_location dl ON dc.location_key = dl.location_key
+LEFT JOIN dim_product dp ON fs.product_id = dp.product_id
+LEFT JOIN dim_date dd ON fs.order_date_key = dd.date_key
+LEFT JOIN dim_ship_mode dsm ON fs.ship_mode_key = dsm.ship_mode_key
+"""
+
+# Layout dtype dataset di memori: string dimensi -> category, NUMERIC (Decimal)
+# -> float64, angka kecil -> int sekecil mungkin. discount tetap float64 supaya
+# batas bin diskon (0.1, 0.2, ...) tidak bergeser karena pembulatan float32.
+DATASET_DTYPES = {
+    'country': 'category',
+    'city': 'category',
+    'state': 'category',
+    'region': 'category',
+    'product_name': 'category',
+    'category': 'category',
+    'sub_category': 'category',
+    'customer_name': 'category',
+    'segment': 'category',
+    'day_of_week': 'category',
+    'ship_mode': 'category',
+    'sales': 'float64',
+    'profit': 'float64',
+    'discount': 'float64',
+    'quantity': 'int32',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'month': 'int8',
+    'quarter': 'int8',
+    'year': 'int16',
+}
+
+# Kolom key dari fs.* yang sudah terwakili oleh kolom dimensi hasil join
+DROP_COLUMNS = ['order_date_key', 'ship_mode_key']
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_current = None
+_versions = {}
+_next_version = 1
+
+
+def load_from_database():
+    with get_connection() as conn:
+        df = pd.read_sql(MAIN_QUERY, conn)
+    df['full_date'] = pd.to_datetime(df['full_date'])
+    return df
+
+
+def load_raw_data():
+    # Snapshot Arrow dari ETL dipakai bila masih segar; Postgres hanya fallback
+    df = read_snapshot()
+    if df is None:
+        df = load_from_database()
+    return df
+
+
+def compact_dtypes(df):
+    """Terapkan DATASET_DTYPES; kembalikan (frame, memori sebelum, memori sesudah) dalam byte."""
+    before = int(df.memory_usage(deep=True).sum())
+    df = df.drop(columns=[col for col in DROP_COLUMNS if col in df.columns])
+    for col, dtype in DATASET_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith('int') and df[col].isna().any():
+            # Hasil LEFT JOIN bisa kosong: pakai integer nullable (Int8, Int16, ...)
+            dtype = dtype.capitalize()
+        df[col] = df[col].astype(dtype)
+    after = int(df.memory_usage(deep=True).sum())
+    return df, before, after
+
+
+def sort_by_date(df):
+    # Dataset disimpan terurut per full_date supaya filter tanggal menjadi slice kontigu
+    if df['full_date'].is_monotonic_increasing:
+        return df
+    return df.sort_values('full_date', kind='stable', ignore_index=True)
+
+
+def freeze(df):
+    """Best-effort: tandai array numpy tiap kolom read-only lewat to_numpy(copy=False).
+    Penulisan lewat array kolom (df[col].to_numpy()) jadi error, tetapi .loc / .iloc
+    tetap bisa menulis ke blok pandas; konvensi assign()/copy yang menjadi jaminannya."""
+    unfrozen = []
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # .cat.codes sudah berupa view read-only
+            continue
+        values = df[col].to_numpy(copy=False)
+        if isinstance(values, np.ndarray) and values.flags.writeable:
+            values.flags.writeable = False
+        if df[col].to_numpy(copy=False).flags.writeable:
+            unfrozen.append(col)
+    if unfrozen:
+        logger.debug("Kolom dataset tidak bisa dibekukan: %s", ', '.join(unfrozen))
+    return df
+
+
+def prepare_dataset(raw):
+    df, memory_before, _ = compact_dtypes(raw)
+    df = derive_columns(sort_by_date(df))
+    memory_after = int(df.memory_usage(deep=True).sum())
+    return freeze(df), memory_before, memory_after
+
+
+def load_data():
+    df, _, _ = prepare_dataset(load_raw_data())
+    return df
+
+
+def _is_expired(entry):
+    return DATA_TTL_SECONDS > 0 and time.time() - entry['loaded_at'] > DATA_TTL_SECONDS
+
+
+def _refresh_locked():
+    global _current, _next_version
+
+    df, memory_before, memory_after = prepare_dataset(load_raw_data())
+    version = _next_version
+    _next_version += 1
+
+    entry = {
+        'version': version,
+        'data': df,
+        'loaded_at': time.time(),
+    }
+    # Versi lama tetap hidup selama masih dipegang session yang sedang rerun,
+    # jadi dicatat lewat weakref supaya laporan memori tetap akurat.
+    _versions[version] = {
+        'ref': weakref.ref(df),
+        'loaded_at': entry['loaded_at'],
+        'rows': len(df),
+        'memory_before_bytes': memory_before,
+        'memory_bytes': memory_after,
+    }
+    logger.info(
+        "Dataset versi %s dimuat: %s baris, memori %.1f MB -> %.1f MB",
+        version, len(df), memory_before / 1024 ** 2, memory_after / 1024 ** 2
+    )
+    _current = entry
+    return entry
+
+
+def get_versioned_dataset():
+    """(versi, dataset bersama read-only); dimuat ulang bila belum ada atau TTL habis."""
+    with _lock:
+        entry = _current
+        if entry is None or _is_expired(entry):
+            entry = _refresh_locked()
+        return entry['version'], entry['data']
+
+
+def get_dataset():
+    return get_versioned_dataset()[1]
+
+
+def get_version():
+    with _lock:
+        if _current is None:
+            return None
+        return _current['version']
+
+
+def invalidate():
+    """Buang versi aktif; pemanggilan get_dataset() berikutnya memuat ulang dari database."""
+    global _current
+    with _lock:
+        _current = None
+
+
+def memory_report():
+    with _lock:
+        active = _current['version'] if _current is not None else None
+        report = []
+        for version, info in list(_versions.items()):
+            alive = info['ref']() is not None
+            if not alive and version != active:
+                del _versions[version]
+                continue
+            report.append({
+                'version': version,
+                'active': version == active,
+                'loaded_at': pd.Timestamp(info['loaded_at'], unit='s'),
+                'rows': info['rows'],
+                'memory_before_mb': round(info['memory_before_bytes'] / 1024 ** 2, 2),
+                'memory_mb': round(info['memory_bytes'] / 1024 ** 2, 2),
+            })
+        return report
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+
+# Satu engine (dan satu pool koneksi) per proses, dipakai bersama oleh app.py,
+# semua halaman dan script ETL. Konfigurasi dibaca dari environment:
+#   DATABASE_URL                      URL lengkap SQLAlchemy (prioritas utama)
+#   PGHOST, PGPORT, PGUSER,
+#   PGPASSWORD, PGDATABASE            dipakai bila DATABASE_URL kosong
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW,
+#   DB_POOL_TIMEOUT, DB_POOL_RECYCLE  ukuran dan perilaku pool
+
+DEFAULT_DATABASE = {
+    'host': 'localhost',
+    'port': '5432',
+    'user': 'postgres',
+    'password': 'root',
+    'database': 'carrefour',
+}
+
+_lock = threading.Lock()
+_engine = None
+_wait_stats = {
+    'checkouts': 0,
+    'wait_total_seconds': 0.0,
+    'wait_max_seconds': 0.0,
+}
+
+
+def database_url():
+    url = os.environ.get('DATABASE_URL')
+    if url:
+        return url
+    host = os.environ.get('PGHOST', DEFAULT_DATABASE['host'])
+    port = os.environ.get('PGPORT', DEFAULT_DATABASE['port'])
+    user = os.environ.get('PGUSER', DEFAULT_DATABASE['user'])
+    password = os.environ.get('PGPASSWORD', DEFAULT_DATABASE['password'])
+    database = os.environ.get('PGDATABASE', DEFAULT_DATABASE['database'])
+    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
+
+
+def pool_settings():
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True,
+    }
+
+
+def get_engine():
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = create_engine(database_url(), **pool_settings())
+        return _engine
+
+
+def dispose_engine():
+    global _engine
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+def _record_wait(seconds):
+    with _lock:
+        _wait_stats['checkouts'] += 1
+        _wait_stats['wait_total_seconds'] += seconds
+        _wait_stats['wait_max_seconds'] = max(_wait_stats['wait_max_seconds'], seconds)
+
+
+@contextmanager
+def get_connection():
+    """Koneksi SQLAlchemy dari pool; otomatis dikembalikan ke pool setelah dipakai."""
+    engine = get_engine()
+    start = time.perf_counter()
+    conn = engine.connect()
+    _record_wait(time.perf_counter() - start)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def get_raw_connection():
+    """Koneksi DBAPI (psycopg2) dari pool, untuk cursor/COPY."""
+    engine = get_engine()
+    start = time.perf_counter()
+    conn = engine.raw_connection()
+    _record_wait(time.perf_counter() - start)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def pool_metrics():
+    engine = get_engine()
+    pool = engine.pool
+    with _lock:
+        stats = dict(_wait_stats)
+    checkouts = stats['checkouts']
+    return {
+        'pool_size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow(),
+        'checkouts_total': checkouts,
+        'wait_total_seconds': round(stats['wait_total_seconds'], 6),
+        'wait_avg_seconds': round(stats['wait_total_seconds'] / checkouts, 6) if checkouts else 0.0,
+        'wait_max_seconds': round(stats['wait_max_seconds'], 6),
+    }
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Distinct count untuk KPI order/customer tanpa nunique():
+#   - eksak: order_id/customer_id di-encode sekali saat load menjadi kode integer
+#     padat (0..n-1), lalu dihitung dengan bincount / bitset per grup;
+#   - aproksimasi: sketch HyperLogLog (register uint8) yang bisa digabung lintas
+#     bulan/region, dipakai rollup.py bila DASHBOARD_ROLLUP_SKETCHES=1.
+#
+# Hash sketch dihitung dari nilai id aslinya (pd.util.hash_array), bukan dari
+# kode, jadi sketch yang disimpan di database tetap valid setelah reload.
+
+HLL_PRECISION = int(os.environ.get('DASHBOARD_HLL_PRECISION', '12'))
+
+# Ukuran maksimum bitset (grup x kode) sebelum beralih ke np.unique
+BITSET_LIMIT = 50_000_000
+
+
+def encode(values):
+    """Kode integer padat per nilai (urutan kemunculan); nilai kosong menjadi -1."""
+    codes, uniques = pd.factorize(values)
+    dtype = np.int32 if len(uniques) < np.iinfo(np.int32).max else np.int64
+    return pd.Series(codes.astype(dtype), index=getattr(values, 'index', None))
+
+
+def count_distinct(codes):
+    """Jumlah kode unik (kode -1 diabaikan)."""
+    codes = np.asarray(codes)
+    codes = codes[codes >= 0]
+    if codes.size == 0:
+        return 0
+    return int(np.count_nonzero(np.bincount(codes)))
+
+
+def count_distinct_by(groups, codes, n_groups=None):
+    """Jumlah kode unik per kode grup 0..n_groups-1 (array panjang n_groups)."""
+    groups = np.asarray(groups, dtype=np.int64)
+    codes = np.asarray(codes, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(groups.max()) + 1 if groups.size else 0
+
+    valid = (groups >= 0) & (codes >= 0)
+    groups, codes = groups[valid], codes[valid]
+    if codes.size == 0:
+        return np.zeros(n_groups, dtype=np.int64)
+
+    n_codes = int(codes.max()) + 1
+    pairs = groups * n_codes + codes
+    if n_groups * n_codes <= BITSET_LIMIT:
+        seen = np.zeros(n_groups * n_codes, dtype=bool)
+        seen[pairs] = True
+        return seen.reshape(n_groups, n_codes).sum(axis=1)
+    return np.bincount(np.unique(pairs) // n_codes, minlength=n_groups)
+
+
+# -------------------------------
+# HyperLogLog
+# -------------------------------
+def _hashes(values):
+    values = np.asarray(values, dtype=object)
+    values = values[pd.notna(values)]
+    return pd.util.hash_array(values.astype(str).astype(object))
+
+
+def _bit_length(values):
+    # frexp eksak untuk integer < 2**53, jadi uint64 dipecah dua bagian 32 bit
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def hll_sketch(values, precision=HLL_PRECISION):
+    """Register HyperLogLog (2**precision byte) untuk kumpulan id."""
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    hashes = _hashes(values)
+    if hashes.size == 0:
+        return registers
+
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+    rank = np.minimum(64 - _bit_length(rest) + 1, 64 - precision + 1).astype(np.uint8)
+    np.maximum.at(registers, index, rank)
+    return registers
+
+
+def hll_merge(sketches):
+    """Gabungan sketch (max per register); None bila tidak ada sketch."""
+    sketches = [sketch for sketch in sketches if sketch is not None]
+    if not sketches:
+        return None
+    return np.maximum.reduce(sketches)
+
+
+def hll_count(registers):
+    """Estimasi jumlah unik dari register, dengan koreksi linear counting untuk set kecil."""
+    if registers is None:
+        return 0
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+def hll_to_bytes(registers):
+    return registers.tobytes()
+
+
+def hll_from_bytes(data):
+    if data is None:
+        return None
+    return np.frombuffer(bytes(data), dtype=np.uint8)
@@ -0,0 +1,34 @@
+import argparse
+
+from database import get_connection
+from forecast import MODEL_PATH, load_monthly_products, run_forecast, write_forecast
+from snapshot import current_watermark
+
+# Job batch prediksi stok: query bulanan per produk, latih model global (atau
+# pakai model tersimpan bila belum ada bulan baru), lalu tulis prediksi beserta
+# metadata model ke fact_stock_forecast. Dijalankan setelah ETL:
+#
+#   python -m etl_script.forecast_job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latih model stok dan tulis prediksi ke fact_stock_forecast")
+    parser.add_argument('--model-path', default=MODEL_PATH, help="File model joblib")
+    args = parser.parse_args()
+
+    monthly = load_monthly_products()
+    result = run_forecast(monthly, current_watermark(), args.model_path)
+
+    with get_connection() as conn:
+        with conn.begin():
+            write_forecast(conn, result)
+
+    print(f"{len(result):,} prediksi stok ditulis ke fact_stock_forecast")
+    if not result.empty:
+        row = result.iloc[0]
+        print(f"trained_at={row['trained_at']} watermark={row['data_watermark']} "
+              f"MAE={row['mae']} RMSE={row['rmse']} MAPE={row['mape']}")
+
+
+if __name__ == '__main__':
+    main()
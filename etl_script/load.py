@@ -0,0 +1,300 @@
+import argparse
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from data_store import load_from_database
+from database import get_connection
+from etl_script.schema import create_tables
+from etl_script.transform import CHUNK_ROWS, SalesTransformer, iter_tables, parse_order_dates
+from customer_activity import refresh_customer_activity
+from rollup import SKETCHES, refresh_rollup
+from snapshot import current_watermark, write_snapshot
+
+# Loader bulk: setiap tabel di-stream lewat COPY FROM STDIN ke staging table
+# sementara, lalu di-merge ke tabel target dengan INSERT ... ON CONFLICT.
+#
+# CSV dibaca per chunk (lihat transform.py) dan tiap chunk langsung di-COPY,
+# jadi memori tidak bergantung pada ukuran file.
+#
+# Secara default load bersifat incremental: hanya baris setelah watermark
+# (Row ID / Order Date di etl_watermark) yang diproses, dimensi di-upsert dengan
+# surrogate key stabil, dan semuanya di-commit dalam satu transaksi. Rollup
+# bulanan dan customer_activity hanya dihitung ulang untuk bulan/customer yang
+# tersentuh delta.
+#
+#   python -m etl_script.load --csv dataset/sales.csv          # delta
+#   python -m etl_script.load --csv dataset/sales.csv --full   # reload penuh
+
+WATERMARK_SOURCE = 'sales.csv'
+
+# (tabel, kolom, conflict target, kolom yang di-update saat konflik) sesuai urutan foreign key.
+# location_key customer sengaja tidak di-update: lokasi pertama customer dipertahankan.
+TABLES = [
+    ('dim_date', ['date_key', 'full_date', 'day_of_week', 'month', 'quarter', 'year'], 'date_key', []),
+    ('dim_location', ['location_key', 'country', 'city', 'state', 'postal_code', 'region', 'latitude', 'longitude'], 'location_key', []),
+    ('dim_customer', ['customer_id', 'customer_name', 'segment', 'location_key'], 'customer_id', ['customer_name', 'segment']),
+    ('dim_product', ['product_id', 'product_name', 'category', 'sub_category'], 'product_id', ['product_name', 'category', 'sub_category']),
+    ('dim_ship_mode', ['ship_mode_key', 'ship_mode'], 'ship_mode', []),
+    ('fact_sales', ['order_id', 'order_date_key', 'customer_id', 'product_id', 'ship_mode_key', 'sales', 'quantity', 'discount', 'profit'], 'order_id',
+     ['order_date_key', 'customer_id', 'product_id', 'ship_mode_key', 'sales', 'quantity', 'discount', 'profit']),
+]
+
+# Kolom SERIAL yang diisi eksplisit dari transform, sequence-nya disesuaikan setelah load
+SERIAL_COLUMNS = {
+    'dim_location': 'location_key',
+    'dim_ship_mode': 'ship_mode_key',
+}
+
+TRUNCATE_ALL = "TRUNCATE TABLE fact_sales, dim_customer, dim_product, dim_ship_mode, dim_location, dim_date RESTART IDENTITY CASCADE"
+
+COPY_CHUNK_ROWS = 50000
+
+
+class FrameReader:
+    """File-like read() di atas DataFrame; CSV dibuat per potongan baris, bukan sekaligus."""
+
+    def __init__(self, frame, chunk_rows=COPY_CHUNK_ROWS):
+        self.frame = frame
+        self.chunk_rows = chunk_rows
+        self.position = 0
+        self.buffer = ''
+
+    def _fill(self):
+        if self.position >= len(self.frame):
+            return False
+        chunk = self.frame.iloc[self.position:self.position + self.chunk_rows]
+        self.position += self.chunk_rows
+        self.buffer += chunk.to_csv(index=False, header=False, date_format='%Y-%m-%d')
+        return True
+
+    def read(self, size=-1):
+        while (size < 0 or len(self.buffer) < size) and self._fill():
+            pass
+        if size < 0:
+            data, self.buffer = self.buffer, ''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self):
+        while '\n' not in self.buffer and self._fill():
+            pass
+        index = self.buffer.find('\n')
+        if index < 0:
+            data, self.buffer = self.buffer, ''
+        else:
+            data, self.buffer = self.buffer[:index + 1], self.buffer[index + 1:]
+        return data
+
+
+def merge_sql(table, columns, conflict, staging, update_columns=None):
+    column_list = ', '.join(columns)
+    if not update_columns:
+        action = "DO NOTHING"
+    else:
+        assignments = ', '.join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+        current = ', '.join(f"{table}.{col}" for col in update_columns)
+        incoming = ', '.join(f"EXCLUDED.{col}" for col in update_columns)
+        # Baris yang tidak berubah dilewati supaya tidak ada write percuma
+        action = f"DO UPDATE SET {assignments} WHERE ({current}) IS DISTINCT FROM ({incoming})"
+    # DISTINCT ON + stg_seq: baris pertama per key (urutan file) yang dipakai
+    return f"""
+    INSERT INTO {table} ({column_list})
+    SELECT DISTINCT ON ({conflict}) {column_list} FROM {staging}
+    ORDER BY {conflict}, stg_seq
+    ON CONFLICT ({conflict}) {action}
+    """
+
+
+def create_staging(cursor, table):
+    staging = f"stg_{table}"
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS, stg_seq BIGSERIAL) ON COMMIT DROP"
+    )
+    return staging
+
+
+def copy_rows(cursor, staging, columns, frame):
+    column_list = ', '.join(columns)
+    cursor.copy_expert(
+        f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)",
+        FrameReader(frame[columns])
+    )
+
+
+def merge_staging(cursor, table, columns, conflict, staging, update_columns=None):
+    cursor.execute(merge_sql(table, columns, conflict, staging, update_columns))
+    merged = cursor.rowcount
+    if table in SERIAL_COLUMNS:
+        key = SERIAL_COLUMNS[table]
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{key}'), COALESCE(MAX({key}), 1)) FROM {table}"
+        )
+    return merged
+
+
+def load_tables(conn, chunks, truncate=False):
+    """COPY potongan tabel per chunk ke staging, lalu merge sekali per tabel.
+
+    Berjalan di transaksi milik pemanggil; kembalikan statistik per tabel.
+    """
+    cursor = conn.cursor()
+    if truncate:
+        cursor.execute(TRUNCATE_ALL)
+
+    staging = {}
+    stats = {}
+    for table, columns, conflict, update_columns in TABLES:
+        staging[table] = create_staging(cursor, table)
+        stats[table] = {'table': table, 'rows': 0, 'merged': 0, 'seconds': 0.0}
+
+    # Fakta ditulis ke staging selama file dibaca, tanpa menunggu seluruh file
+    for tables in chunks:
+        for table, columns, conflict, update_columns in TABLES:
+            frame = tables[table]
+            if frame.empty:
+                continue
+            start = time.perf_counter()
+            copy_rows(cursor, staging[table], columns, frame)
+            stats[table]['seconds'] += time.perf_counter() - start
+            stats[table]['rows'] += len(frame)
+
+    for table, columns, conflict, update_columns in TABLES:
+        start = time.perf_counter()
+        stats[table]['merged'] = merge_staging(cursor, table, columns, conflict, staging[table], update_columns)
+        stats[table]['seconds'] += time.perf_counter() - start
+    cursor.close()
+
+    result = []
+    for item in stats.values():
+        elapsed = item['seconds']
+        item['seconds'] = round(elapsed, 3)
+        item['rows_per_second'] = round(item['rows'] / elapsed) if elapsed > 0 else item['rows']
+        result.append(item)
+    return result
+
+
+def read_watermark(conn):
+    row = conn.execute(
+        text("SELECT last_row_id, last_order_date FROM etl_watermark WHERE source = :source"),
+        {'source': WATERMARK_SOURCE}
+    ).fetchone()
+    if row is None:
+        return None
+    return {'last_row_id': row[0], 'last_order_date': pd.Timestamp(row[1]) if row[1] else None}
+
+
+def write_watermark(conn, transformer):
+    conn.execute(
+        text("""
+        INSERT INTO etl_watermark (source, last_row_id, last_order_date, rows_loaded, loaded_at)
+        VALUES (:source, :last_row_id, :last_order_date, :rows_loaded, now())
+        ON CONFLICT (source) DO UPDATE SET
+            last_row_id = GREATEST(etl_watermark.last_row_id, EXCLUDED.last_row_id),
+            last_order_date = GREATEST(etl_watermark.last_order_date, EXCLUDED.last_order_date),
+            rows_loaded = EXCLUDED.rows_loaded,
+            loaded_at = EXCLUDED.loaded_at
+        """),
+        {
+            'source': WATERMARK_SOURCE,
+            'last_row_id': transformer.max_row_id,
+            'last_order_date': transformer.max_order_date.date(),
+            'rows_loaded': transformer.rows,
+        }
+    )
+
+
+def delta_filter(path, watermark, lookback_days=1):
+    """Filter baris: Row ID > watermark, plus tanggal yang tersentuh baris baru / jendela lookback.
+
+    Satu order selalu punya satu Order Date, jadi memilih per tanggal menjamin
+    semua baris sebuah order ikut diproses bersama. Pass pertama hanya membaca
+    kolom Row ID dan Order Date.
+    """
+    if watermark is None:
+        return None
+
+    last_row_id = watermark['last_row_id']
+    touched = set()
+    for chunk in pd.read_csv(path, usecols=['Row ID', 'Order Date'], chunksize=CHUNK_ROWS):
+        new_rows = chunk['Row ID'] > last_row_id
+        touched.update(parse_order_dates(chunk.loc[new_rows, 'Order Date']).dropna())
+
+    window_start = None
+    if watermark['last_order_date'] is not None:
+        window_start = watermark['last_order_date'] - pd.Timedelta(days=lookback_days)
+
+    def row_filter(chunk):
+        order_dates = parse_order_dates(chunk['Order Date'])
+        mask = (chunk['Row ID'] > last_row_id) | order_dates.isin(touched)
+        if window_start is not None:
+            mask |= order_dates >= window_start
+        return mask
+
+    return row_filter
+
+
+def read_existing_keys(conn):
+    locations = pd.read_sql(
+        "SELECT location_key, country, city, state, postal_code, region, latitude, longitude FROM dim_location",
+        conn
+    )
+    ship_modes = pd.read_sql("SELECT ship_mode_key, ship_mode FROM dim_ship_mode", conn)
+    return locations, ship_modes
+
+
+def print_stats(stats):
+    print(f"{'Tabel':<15}{'Baris':>10}{'Merge':>10}{'Detik':>10}{'Baris/detik':>14}")
+    for item in stats:
+        print(f"{item['table']:<15}{item['rows']:>10,}{item['merged']:>10,}{item['seconds']:>10.3f}{item['rows_per_second']:>14,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load sales.csv ke star schema Postgres lewat COPY")
+    parser.add_argument('--csv', default='dataset/sales.csv', help="Path file sales.csv")
+    parser.add_argument('--full', action='store_true', help="Kosongkan tabel lalu load ulang seluruh file")
+    parser.add_argument('--lookback-days', type=int, default=1, help="Hari sebelum watermark yang ikut diproses ulang")
+    parser.add_argument('--sketches', action='store_true', default=SKETCHES,
+                        help="Bangun sketch HyperLogLog customer_hll di rollup (default: DASHBOARD_ROLLUP_SKETCHES)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Jumlah baris CSV per chunk")
+    args = parser.parse_args()
+
+    # Seluruh load (dimensi, fakta, watermark, rollup, customer_activity) dalam satu transaksi:
+    # pembaca dashboard hanya melihat state sebelum atau sesudah load.
+    with get_connection() as conn:
+        with conn.begin():
+            create_tables(conn)
+            if args.full:
+                conn.execute(text("DELETE FROM etl_watermark WHERE source = :source"), {'source': WATERMARK_SOURCE})
+                transformer = SalesTransformer()
+                row_filter = None
+            else:
+                locations, ship_modes = read_existing_keys(conn)
+                transformer = SalesTransformer(locations, ship_modes)
+                row_filter = delta_filter(args.csv, read_watermark(conn), args.lookback_days)
+
+            chunks = iter_tables(args.csv, transformer, row_filter, args.chunk_rows)
+            stats = load_tables(conn.connection, chunks, truncate=args.full)
+            if transformer.rows == 0:
+                print("Tidak ada baris baru sejak watermark terakhir")
+                return
+
+            write_watermark(conn, transformer)
+            if args.full:
+                refresh_rollup(conn, sketches=args.sketches)
+                refresh_customer_activity(conn)
+            else:
+                refresh_rollup(conn, transformer.seen_dates, sketches=args.sketches)
+                refresh_customer_activity(conn, transformer.seen_customers)
+
+    print_stats(stats)
+    print(f"Data inserted successfully! ({transformer.rows:,} baris sumber diproses)")
+
+    # Snapshot kolumnar untuk startup dashboard, dibuat dari data yang sudah di-commit
+    path = write_snapshot(load_from_database(), current_watermark())
+    print(f"Snapshot dataset ditulis ke {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+from sqlalchemy import text
+
+# DDL star schema, sama dengan yang dulu dijalankan dari main.ipynb
+
+create_dim_date = """
+CREATE TABLE IF NOT EXISTS dim_date (
+    date_key INT PRIMARY KEY,
+    full_date DATE NOT NULL,
+    day_of_week VARCHAR(10),
+    month INT,
+    quarter INT,
+    year INT
+);
+"""
+
+create_dim_location = """
+CREATE TABLE IF NOT EXISTS dim_location (
+    location_key SERIAL PRIMARY KEY,
+    country TEXT,
+    city TEXT,
+    state TEXT,
+    postal_code INT,
+    region TEXT,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION
+);
+"""
+
+create_dim_customer = """
+CREATE TABLE IF NOT EXISTS dim_customer (
+    customer_id TEXT PRIMARY KEY,
+    customer_name TEXT,
+    segment TEXT,
+    location_key INT NOT NULL REFERENCES dim_location(location_key)
+);
+"""
+
+create_dim_product = """
+CREATE TABLE IF NOT EXISTS dim_product (
+    product_id TEXT PRIMARY KEY,
+    product_name TEXT,
+    category TEXT,
+    sub_category TEXT
+);
+"""
+
+create_dim_ship_mode = """
+CREATE TABLE IF NOT EXISTS dim_ship_mode (
+    ship_mode_key SERIAL PRIMARY KEY,
+    ship_mode TEXT UNIQUE NOT NULL
+);
+"""
+
+create_fact_sales = """
+CREATE TABLE IF NOT EXISTS fact_sales (
+    order_id TEXT PRIMARY KEY,
+    order_date_key INT NOT NULL REFERENCES dim_date(date_key),
+    customer_id TEXT NOT NULL REFERENCES dim_customer(customer_id),
+    product_id TEXT NOT NULL REFERENCES dim_product(product_id),
+    ship_mode_key INT NOT NULL REFERENCES dim_ship_mode(ship_mode_key),
+    sales NUMERIC,
+    quantity INT,
+    discount NUMERIC,
+    profit NUMERIC
+);
+"""
+
+create_etl_watermark = """
+CREATE TABLE IF NOT EXISTS etl_watermark (
+    source TEXT PRIMARY KEY,
+    last_row_id BIGINT NOT NULL,
+    last_order_date DATE,
+    rows_loaded BIGINT,
+    loaded_at TIMESTAMP NOT NULL DEFAULT now()
+);
+"""
+
+CREATE_TABLES = [
+    create_dim_date,
+    create_dim_location,
+    create_dim_customer,
+    create_dim_product,
+    create_dim_ship_mode,
+    create_fact_sales,
+    create_etl_watermark,
+]
+
+
+def create_tables(conn):
+    for statement in CREATE_TABLES:
+        conn.execute(text(statement))
@@ -0,0 +1,148 @@
+import pandas as pd
+
+# Transform sales.csv menjadi tabel star schema (port dari cell Transform di main.ipynb).
+# CSV dibaca per chunk; key dimensi dicari lewat dictionary di memori sehingga
+# tidak ada merge satu frame penuh. Memori puncak bergantung pada ukuran chunk
+# dan jumlah anggota dimensi, bukan ukuran file.
+
+CHUNK_ROWS = 100000
+
+COLUMN_NAMES = {
+    'Country': 'country',
+    'City': 'city',
+    'State': 'state',
+    'Postal Code': 'postal_code',
+    'Region': 'region',
+    'Latitude': 'latitude',
+    'Longitude': 'longitude',
+    'Customer ID': 'customer_id',
+    'Customer Name': 'customer_name',
+    'Product ID': 'product_id',
+    'Category': 'category',
+    'Sub-Category': 'sub_category',
+    'Product Name': 'product_name',
+    'Sales': 'sales',
+    'Quantity': 'quantity',
+    'Discount': 'discount',
+    'Profit': 'profit',
+    'Stock': 'stock',
+    'Segment': 'segment',
+    'Ship Mode': 'ship_mode',
+    'Order ID': 'order_id',
+}
+
+LOCATION_COLUMNS = ['country', 'city', 'state', 'postal_code', 'region', 'latitude', 'longitude']
+
+FACT_COLUMNS = ['order_id', 'order_date_key', 'customer_id', 'product_id', 'ship_mode_key', 'sales', 'quantity', 'discount', 'profit']
+
+
+def parse_order_dates(values):
+    return pd.to_datetime(values, format='%m/%d/%Y', errors='coerce')
+
+
+class SalesTransformer:
+    """Menyimpan lookup dimensi antar chunk dan mengubah tiap chunk menjadi potongan tabel."""
+
+    def __init__(self, locations=None, ship_modes=None):
+        self.location_keys = {}
+        self.ship_mode_keys = {}
+        if locations is not None:
+            for row in locations.itertuples(index=False):
+                self.location_keys[tuple(getattr(row, col) for col in LOCATION_COLUMNS)] = int(row.location_key)
+        if ship_modes is not None:
+            self.ship_mode_keys = dict(zip(ship_modes['ship_mode'], ship_modes['ship_mode_key'].astype(int)))
+
+        self.seen_dates = set()
+        self.seen_customers = set()
+        self.seen_products = set()
+        self.rows = 0
+        self.max_row_id = None
+        self.max_order_date = None
+
+    def _lookup(self, keys, values):
+        """Key untuk tiap nilai; nilai baru mendapat max+1. Kembalikan (key per baris, anggota baru)."""
+        result = []
+        new_members = []
+        next_key = max(keys.values(), default=0) + 1
+        for value in values:
+            key = keys.get(value)
+            if key is None:
+                key = next_key
+                next_key += 1
+                keys[value] = key
+                new_members.append((key, value))
+            result.append(key)
+        return result, new_members
+
+    def transform_chunk(self, chunk):
+        chunk = chunk.dropna()
+        order_dates = parse_order_dates(chunk['Order Date'])
+        chunk = chunk[order_dates.notna()]
+        order_dates = order_dates[order_dates.notna()]
+        if chunk.empty:
+            return None
+
+        self.rows += len(chunk)
+        row_id = int(chunk['Row ID'].max())
+        self.max_row_id = row_id if self.max_row_id is None else max(self.max_row_id, row_id)
+        chunk_max_date = order_dates.max()
+        self.max_order_date = chunk_max_date if self.max_order_date is None else max(self.max_order_date, chunk_max_date)
+
+        chunk = chunk.drop(['Ship Date', 'Row ID', 'Order Date'], axis=1).rename(columns=COLUMN_NAMES)
+        chunk['profit'] = pd.to_numeric(chunk['profit'], errors='coerce')
+        chunk['stock'] = pd.to_numeric(chunk['stock'], errors='coerce')
+        chunk['sales'] = pd.to_numeric(chunk['sales'], errors='coerce')
+        chunk['postal_code'] = chunk['postal_code'].astype('int64')
+        chunk['order_date_key'] = order_dates.astype('int64') // 10**9
+
+        new_dates = order_dates.drop_duplicates()
+        new_dates = new_dates[~new_dates.isin(self.seen_dates)]
+        self.seen_dates.update(new_dates)
+        dim_date = pd.DataFrame({
+            'date_key': new_dates.astype('int64') // 10**9,
+            'full_date': new_dates,
+            'day_of_week': new_dates.dt.day_name(),
+            'month': new_dates.dt.month,
+            'quarter': new_dates.dt.quarter,
+            'year': new_dates.dt.year,
+        })
+
+        location_values = zip(*(chunk[col].tolist() for col in LOCATION_COLUMNS))
+        location_keys, new_locations = self._lookup(self.location_keys, location_values)
+        chunk['location_key'] = location_keys
+        dim_location = pd.DataFrame(
+            [(key,) + value for key, value in new_locations],
+            columns=['location_key'] + LOCATION_COLUMNS
+        )
+
+        ship_mode_keys, new_ship_modes = self._lookup(self.ship_mode_keys, chunk['ship_mode'].tolist())
+        chunk['ship_mode_key'] = ship_mode_keys
+        dim_ship_mode = pd.DataFrame(new_ship_modes, columns=['ship_mode_key', 'ship_mode'])
+
+        # Baris pertama per customer/product yang dipakai, sama dengan ON CONFLICT DO NOTHING versi lama
+        dim_customer = chunk[['customer_id', 'customer_name', 'segment', 'location_key']].drop_duplicates('customer_id')
+        dim_customer = dim_customer[~dim_customer['customer_id'].isin(self.seen_customers)]
+        self.seen_customers.update(dim_customer['customer_id'])
+
+        dim_product = chunk[['product_id', 'product_name', 'category', 'sub_category']].drop_duplicates('product_id')
+        dim_product = dim_product[~dim_product['product_id'].isin(self.seen_products)]
+        self.seen_products.update(dim_product['product_id'])
+
+        return {
+            'dim_date': dim_date,
+            'dim_location': dim_location,
+            'dim_customer': dim_customer,
+            'dim_product': dim_product,
+            'dim_ship_mode': dim_ship_mode,
+            'fact_sales': chunk[FACT_COLUMNS],
+        }
+
+
+def iter_tables(path, transformer, row_filter=None, chunk_rows=CHUNK_ROWS):
+    """Generator potongan tabel per chunk CSV. row_filter(chunk) -> mask baris yang diproses."""
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        if row_filter is not None:
+            chunk = chunk[row_filter(chunk)]
+        tables = transformer.transform_chunk(chunk)
+        if tables is not None:
+            yield tables
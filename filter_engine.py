@@ -0,0 +1,137 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Index filter untuk sidebar: bitmap baris per nilai dimensi (region, category,
+# segment) dan kolom tanggal yang terurut. Kombinasi filter dijawab dengan
+# AND bitmap + searchsorted, tanpa main_data.copy() dan tanpa masking ulang
+# seluruh frame setiap kali widget berubah.
+
+ALL = 'Semua'
+
+FILTER_COLUMNS = ('region', 'category', 'segment')
+
+
+class FilterIndex:
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        # Hanya weakref: index di cache tidak boleh membuat versi dataset lama tetap hidup
+        self._df = weakref.ref(df)
+        self.bitmaps = {}
+        for col in columns:
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes = values.cat.codes.to_numpy()
+                categories = values.cat.categories
+            else:
+                codes, categories = pd.factorize(values)
+            self.bitmaps[col] = {
+                value: codes == code for code, value in enumerate(categories)
+            }
+
+        # Dataset dari data_store sudah terurut per full_date: rentang tanggal cukup
+        # dijawab dengan searchsorted menjadi slice kontigu. argsort hanya dipakai
+        # untuk frame lain yang belum terurut.
+        dates = df['full_date'].to_numpy()
+        if df['full_date'].is_monotonic_increasing:
+            self.date_order = None
+            self.sorted_dates = dates
+        else:
+            self.date_order = np.argsort(dates, kind='stable')
+            self.sorted_dates = dates[self.date_order]
+
+    @property
+    def df(self):
+        df = self._df()
+        if df is None:
+            raise ReferenceError("Dataset untuk FilterIndex ini sudah tidak ada")
+        return df
+
+    def _date_bounds(self, start, end):
+        lo = 0
+        hi = len(self.sorted_dates)
+        if start is not None:
+            lo = np.searchsorted(self.sorted_dates, pd.Timestamp(start).to_datetime64(), side='left')
+        if end is not None:
+            hi = np.searchsorted(self.sorted_dates, pd.Timestamp(end).to_datetime64(), side='right')
+        return lo, max(lo, hi)
+
+    def date_slice(self, start=None, end=None):
+        """slice baris untuk rentang tanggal inklusif (hanya untuk dataset terurut)."""
+        if self.date_order is not None:
+            raise ValueError("date_slice butuh dataset yang terurut per full_date")
+        lo, hi = self._date_bounds(start, end)
+        return slice(lo, hi)
+
+    def _dimension_mask(self, region, category, segment):
+        """Bitmap AND dari filter dimensi; None = tanpa filter, False = tidak ada baris cocok."""
+        mask = None
+        for col, value in (('region', region), ('category', category), ('segment', segment)):
+            if value is None or value == ALL:
+                continue
+            bitmap = self.bitmaps[col].get(value)
+            if bitmap is None:
+                return False
+            mask = bitmap if mask is None else mask & bitmap
+        return mask
+
+    def positions(self, region=ALL, category=ALL, segment=ALL, start=None, end=None):
+        """Posisi baris (terurut) yang lolos filter, atau None bila tidak ada filter sama sekali."""
+        mask = self._dimension_mask(region, category, segment)
+        if mask is False:
+            return np.empty(0, dtype=np.intp)
+
+        if start is not None or end is not None:
+            lo, hi = self._date_bounds(start, end)
+            if self.date_order is None:
+                if mask is None:
+                    return np.arange(lo, hi)
+                return lo + np.flatnonzero(mask[lo:hi])
+            rows = np.sort(self.date_order[lo:hi])
+            if mask is not None:
+                rows = rows[mask[rows]]
+            return rows
+
+        if mask is None:
+            return None
+        return np.flatnonzero(mask)
+
+    def select(self, region=ALL, category=ALL, segment=ALL, start=None, end=None):
+        """Frame hasil filter. Tanpa filter dimensi pada dataset terurut, hasilnya slice
+        dari dataset bersama (tanpa copy) -- jangan diubah."""
+        no_dimension_filter = all(value is None or value == ALL for value in (region, category, segment))
+        if no_dimension_filter and self.date_order is None:
+            return self.df.iloc[self.date_slice(start, end)]
+
+        rows = self.positions(region, category, segment, start, end)
+        if rows is None:
+            return self.df
+        return self.df.take(rows)
+
+
+# RLock: finalizer bisa terpanggil oleh GC saat thread yang sama memegang lock
+_lock = threading.RLock()
+_indexes = {}
+
+
+def filter_index(df):
+    """FilterIndex untuk dataset bersama, dibangun sekali per versi dataset."""
+    key = id(df)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and index._df() is df:
+            return index
+
+        index = FilterIndex(df)
+        _indexes[key] = index
+        # Index (dan bitmap-nya) dibuang begitu versi dataset ini tidak dipakai lagi
+        weakref.finalize(df, _drop_index, key, index)
+        return index
+
+
+def _drop_index(key, index):
+    with _lock:
+        if _indexes.get(key) is index:
+            del _indexes[key]
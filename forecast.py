@@ -0,0 +1,257 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_connection
+
+# Prediksi stok bulan depan untuk semua produk sekaligus. Menggantikan loop
+# "satu RandomForest per product_id": satu model global dilatih pada semua baris
+# (produk, bulan) dengan fitur produk, memakai semua core (n_jobs=-1). Model
+# disimpan ke disk dan hanya dilatih ulang bila data bulan baru masuk.
+#
+# Training dijalankan offline oleh etl_script/forecast_job.py, yang menulis
+# hasilnya ke fact_stock_forecast. Halaman hanya memanggil read_forecast(),
+# jadi sklearn/joblib baru di-import di fungsi training.
+
+MONTHLY_PRODUCT_QUERY = """
+SELECT
+    dp.product_id,
+    dp.product_name,
+    DATE_TRUNC('month', dd.full_date) AS bulan,
+    SUM(fs.sales) AS total_penjualan,
+    AVG(fs.quantity) AS rata_rata_stok
+FROM fact_sales fs
+LEFT JOIN dim_product dp ON fs.product_id = dp.product_id
+LEFT JOIN dim_date dd ON fs.order_date_key = dd.date_key
+GROUP BY dp.product_id, dp.product_name, DATE_TRUNC('month', dd.full_date)
+ORDER BY dp.product_id, bulan
+"""
+
+CREATE_FACT_STOCK_FORECAST = """
+CREATE TABLE IF NOT EXISTS fact_stock_forecast (
+    product_id TEXT PRIMARY KEY,
+    product_name TEXT,
+    forecast_month DATE NOT NULL,
+    prediksi_stok_bulan_depan INT,
+    trained_at TIMESTAMP NOT NULL,
+    data_watermark TEXT,
+    training_rows BIGINT,
+    mae NUMERIC,
+    rmse NUMERIC,
+    mape NUMERIC
+)
+"""
+
+FORECAST_COLUMNS = [
+    'product_id', 'product_name', 'forecast_month', 'prediksi_stok_bulan_depan',
+    'trained_at', 'data_watermark', 'training_rows', 'mae', 'rmse', 'mape',
+]
+
+SELECT_FORECAST = """
+SELECT {columns}
+FROM fact_stock_forecast
+ORDER BY product_id
+""".format(columns=', '.join(FORECAST_COLUMNS))
+
+MODEL_PATH = os.environ.get('DASHBOARD_FORECAST_MODEL', os.path.join('dataset', 'stock_forecast.joblib'))
+
+# Produk dengan riwayat kurang dari ini tidak diprediksi (sama dengan versi lama)
+MIN_MONTHS = 4
+
+FEATURE_COLUMNS = [
+    'bulan_num',
+    'month_of_year',
+    'total_penjualan',
+    'product_avg_sales',
+    'product_avg_stock',
+    'product_months',
+]
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# Bundle model per path file, supaya path lain tidak pernah memakai model milik path ini
+_bundles = {}
+
+
+def load_monthly_products():
+    with get_connection() as conn:
+        df = pd.read_sql(MONTHLY_PRODUCT_QUERY, conn)
+    df['bulan'] = pd.to_datetime(df['bulan'])
+    return df
+
+
+def build_features(monthly):
+    """Fitur per baris (produk, bulan); hanya produk dengan riwayat >= MIN_MONTHS."""
+    monthly = monthly.dropna(subset=['product_id', 'bulan', 'rata_rata_stok'])
+    monthly = monthly.sort_values(['product_id', 'bulan'], ignore_index=True)
+    grouped = monthly.groupby('product_id')
+
+    features = pd.DataFrame({
+        'product_id': monthly['product_id'],
+        'product_name': monthly['product_name'],
+        # Indeks bulan absolut, jadi tidak bergeser saat data tahun baru masuk
+        'bulan_num': monthly['bulan'].dt.year * 12 + monthly['bulan'].dt.month - 1,
+        'month_of_year': monthly['bulan'].dt.month,
+        'total_penjualan': monthly['total_penjualan'].astype('float64'),
+        'product_avg_sales': grouped['total_penjualan'].transform('mean').astype('float64'),
+        'product_avg_stock': grouped['rata_rata_stok'].transform('mean').astype('float64'),
+        'product_months': grouped['bulan'].transform('size'),
+        'rata_rata_stok': monthly['rata_rata_stok'].astype('float64'),
+    })
+    return features[features['product_months'] >= MIN_MONTHS].reset_index(drop=True)
+
+
+def next_month_features(features):
+    """Satu baris per produk untuk bulan setelah bulan terakhirnya (penjualan = bulan terakhir)."""
+    last = features.groupby('product_id').tail(1).copy()
+    last['bulan_num'] = last['bulan_num'] + 1
+    last['month_of_year'] = last['bulan_num'] % 12 + 1
+    return last.reset_index(drop=True)
+
+
+def month_start(bulan_num):
+    bulan_num = np.asarray(bulan_num)
+    return pd.to_datetime({'year': bulan_num // 12, 'month': bulan_num % 12 + 1, 'day': 1})
+
+
+def train_model(features):
+    from sklearn.ensemble import RandomForestRegressor
+
+    model = RandomForestRegressor(n_estimators=200, min_samples_leaf=2, n_jobs=-1, random_state=42)
+    model.fit(features[FEATURE_COLUMNS].to_numpy(), features['rata_rata_stok'].to_numpy())
+    return model
+
+
+EMPTY_METRICS = {'mae': None, 'rmse': None, 'mape': None}
+
+
+def evaluate_model(monthly):
+    """Error holdout bulan terakhir, disimulasikan seperti forecast sungguhan: fitur dan
+    model hanya dari riwayat sebelum bulan itu, lalu memprediksi bulan itu."""
+    monthly = monthly.dropna(subset=['bulan'])
+    if monthly.empty:
+        return dict(EMPTY_METRICS)
+    last_month = monthly['bulan'].max()
+    history = build_features(monthly[monthly['bulan'] < last_month])
+    if history.empty:
+        return dict(EMPTY_METRICS)
+
+    # Hanya produk yang bulan berikutnya dari riwayatnya memang bulan holdout
+    upcoming = next_month_features(history).drop(columns=['rata_rata_stok'])
+    upcoming = upcoming[upcoming['bulan_num'] == last_month.year * 12 + last_month.month - 1]
+    actual = monthly.loc[monthly['bulan'] == last_month, ['product_id', 'rata_rata_stok']].dropna()
+    test = upcoming.merge(actual, on='product_id')
+    if test.empty:
+        return dict(EMPTY_METRICS)
+
+    predicted = train_model(history).predict(test[FEATURE_COLUMNS].to_numpy())
+    actual = test['rata_rata_stok'].to_numpy()
+    error = predicted - actual
+    nonzero = actual != 0
+    return {
+        'mae': float(np.abs(error).mean()),
+        'rmse': float(np.sqrt((error ** 2).mean())),
+        'mape': float(np.abs(error[nonzero] / actual[nonzero]).mean() * 100) if nonzero.any() else None,
+    }
+
+
+def save_model(bundle, path=MODEL_PATH):
+    import joblib
+
+    tmp_path = path + '.tmp'
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_model(path=MODEL_PATH):
+    import joblib
+
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception:
+        logger.warning("Model forecast di %s tidak bisa dibaca, dilatih ulang", path)
+        return None
+
+
+def get_model(features, monthly, path=MODEL_PATH):
+    """Model global; dilatih ulang (beserta metrik holdout-nya) hanya bila ada bulan
+    yang lebih baru dari data latihnya."""
+    last_month = int(features['bulan_num'].max())
+    with _lock:
+        bundle = _bundles.get(path) or read_model(path)
+        if (bundle is None or bundle['last_month'] < last_month
+                or bundle['features'] != FEATURE_COLUMNS or 'metrics' not in bundle):
+            logger.info("Melatih model forecast stok: %s baris, %s produk",
+                        len(features), features['product_id'].nunique())
+            bundle = {
+                'model': train_model(features),
+                'features': FEATURE_COLUMNS,
+                'last_month': last_month,
+                'trained_at': pd.Timestamp.now(),
+                'rows': len(features),
+                'metrics': evaluate_model(monthly),
+            }
+            save_model(bundle, path)
+        _bundles[path] = bundle
+        return bundle
+
+
+def forecast_stock(monthly, path=MODEL_PATH):
+    """Prediksi stok bulan depan per produk: product_id, product_name, prediksi_stok_bulan_depan."""
+    features = build_features(monthly)
+    if features.empty:
+        return pd.DataFrame(columns=['product_id', 'product_name', 'prediksi_stok_bulan_depan', 'forecast_month'])
+
+    bundle = get_model(features, monthly, path)
+    upcoming = next_month_features(features)
+    predictions = bundle['model'].predict(upcoming[FEATURE_COLUMNS].to_numpy())
+    return pd.DataFrame({
+        'product_id': upcoming['product_id'],
+        'product_name': upcoming['product_name'],
+        'prediksi_stok_bulan_depan': np.rint(predictions).astype(int),
+        'forecast_month': month_start(upcoming['bulan_num']).to_numpy(),
+    })
+
+
+def run_forecast(monthly, watermark=None, path=MODEL_PATH):
+    """Prediksi + metadata model yang membuatnya, dalam bentuk baris fact_stock_forecast."""
+    result = forecast_stock(monthly, path)
+    if result.empty:
+        return pd.DataFrame(columns=FORECAST_COLUMNS)
+
+    # Metadata dari bundle model yang dipakai memprediksi, termasuk saat model tersimpan dipakai ulang
+    bundle = _bundles[path]
+    result = result.assign(
+        trained_at=bundle['trained_at'],
+        data_watermark=watermark,
+        training_rows=bundle['rows'],
+        **bundle['metrics']
+    )
+    return result[FORECAST_COLUMNS]
+
+
+def write_forecast(conn, result):
+    """Ganti isi fact_stock_forecast dengan hasil run terbaru (dalam transaksi pemanggil)."""
+    conn.execute(text(CREATE_FACT_STOCK_FORECAST))
+    conn.execute(text("DELETE FROM fact_stock_forecast"))
+    if not result.empty:
+        result.to_sql('fact_stock_forecast', conn, if_exists='append', index=False, method='multi', chunksize=1000)
+
+
+def read_forecast():
+    """Prediksi stok yang sudah dihitung job offline, atau None bila tabel belum ada."""
+    try:
+        with get_connection() as conn:
+            df = pd.read_sql(SELECT_FORECAST, conn)
+    except SQLAlchemyError:
+        return None
+    df['forecast_month'] = pd.to_datetime(df['forecast_month'])
+    return df
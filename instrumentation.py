@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+from prometheus_client import Counter, Histogram, start_http_server
+
+# Instrumentasi ringan per section render (blok KPI, chart, tahap halaman):
+# durasi, jumlah baris yang diproses dan ukuran payload. Hasilnya
+#   - disimpan di ring buffer per (halaman, section) untuk p50/p95 di halaman admin,
+#   - dicatat sebagai log terstruktur (logger 'dashboard.sections'),
+#   - diekspor ke Prometheus bila DASHBOARD_METRICS_PORT di-set.
+
+METRICS_PORT = os.environ.get('DASHBOARD_METRICS_PORT')
+SAMPLE_SIZE = int(os.environ.get('DASHBOARD_SECTION_SAMPLES', '1000'))
+JSON_LOGS = os.environ.get('DASHBOARD_JSON_LOGS', '').lower() in ('1', 'true', 'yes')
+
+logger = logging.getLogger('dashboard.sections')
+
+SECTION_SECONDS = Histogram(
+    'dashboard_section_seconds',
+    'Durasi render per section halaman',
+    ['page', 'section'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SECTION_ROWS = Counter('dashboard_section_rows_total', 'Baris yang diproses per section', ['page', 'section'])
+SECTION_PAYLOAD = Counter('dashboard_section_payload_bytes_total', 'Ukuran payload per section', ['page', 'section'])
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=SAMPLE_SIZE))
+_server_started = False
+
+
+class Section:
+
+    def __init__(self, page, name, rows=None):
+        self.page = page
+        self.name = name
+        self.rows = rows
+        self.payload_bytes = None
+
+
+def record(page, name, seconds, rows=None, payload_bytes=None):
+    with _lock:
+        _samples[(page, name)].append((seconds, rows, payload_bytes))
+    SECTION_SECONDS.labels(page, name).observe(seconds)
+    if rows:
+        SECTION_ROWS.labels(page, name).inc(rows)
+    if payload_bytes:
+        SECTION_PAYLOAD.labels(page, name).inc(payload_bytes)
+    logger.info("section %s.%s %.2f ms", page, name, seconds * 1000, extra={
+        'page': page,
+        'section': name,
+        'duration_ms': round(seconds * 1000, 3),
+        'rows': rows,
+        'payload_bytes': payload_bytes,
+    })
+
+
+@contextmanager
+def section(page, name, rows=None):
+    """Ukur satu section; isi section.rows / section.payload_bytes di dalam blok bila perlu."""
+    current = Section(page, name, rows)
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        record(page, name, time.perf_counter() - started, current.rows, current.payload_bytes)
+
+
+def section_report():
+    """p50/p95 durasi, rata-rata baris dan payload per section dari sampel terakhir."""
+    with _lock:
+        samples = {key: list(values) for key, values in _samples.items()}
+
+    report = []
+    for (page, name), values in sorted(samples.items()):
+        durations = np.array([seconds for seconds, _, _ in values]) * 1000
+        rows = [r for _, r, _ in values if r is not None]
+        payloads = [p for _, _, p in values if p is not None]
+        report.append({
+            'page': page,
+            'section': name,
+            'count': len(values),
+            'p50_ms': round(float(np.percentile(durations, 50)), 2),
+            'p95_ms': round(float(np.percentile(durations, 95)), 2),
+            'max_ms': round(float(durations.max()), 2),
+            'avg_rows': int(np.mean(rows)) if rows else None,
+            'avg_payload_kb': round(float(np.mean(payloads)) / 1024, 1) if payloads else None,
+        })
+    return report
+
+
+def configure_logging():
+    """Log section sebagai JSON (python-json-logger) bila DASHBOARD_JSON_LOGS=1."""
+    if not JSON_LOGS or logger.handlers:
+        return
+    from pythonjsonlogger import jsonlogger
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(jsonlogger.JsonFormatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def start_metrics_server():
+    """Endpoint teks Prometheus di DASHBOARD_METRICS_PORT (sekali per proses)."""
+    global _server_started
+    with _lock:
+        if _server_started or not METRICS_PORT:
+            return
+        start_http_server(int(METRICS_PORT))
+        _server_started = True
+    logger.info("Endpoint metrik Prometheus aktif di port %s", METRICS_PORT)
+
+
+configure_logging()
+start_metrics_server()
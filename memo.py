@@ -0,0 +1,174 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# Cache hasil KPI dan agregasi chart, dibagi ke semua session dalam satu proses.
+# Key = (versi dataset, halaman, nama blok, tuple filter yang dinormalisasi), jadi
+# rerun karena widget lain (mis. selectbox Top/Bottom) tidak menghitung ulang KPI.
+# Entri dibuang secara LRU begitu total ukurannya melewati budget memori.
+# Hasil cache dipakai bersama: jangan diubah in-place oleh halaman.
+
+KPI_CACHE_MB = float(os.environ.get('DASHBOARD_KPI_CACHE_MB', '64'))
+FIGURE_CACHE_MB = float(os.environ.get('DASHBOARD_FIGURE_CACHE_MB', '64'))
+
+
+def estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def normalize_value(value):
+    if value is None or value == 'Semua':
+        return None
+    if hasattr(value, 'isoformat'):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_value(item) for item in value)
+    return value
+
+
+def filter_key(**filters):
+    """Tuple filter yang stabil: urutan nama, 'Semua' == None, tanggal sebagai string ISO."""
+    return tuple(sorted((name, normalize_value(value)) for name, value in filters.items()))
+
+
+class MemoCache:
+
+    def __init__(self, name, max_bytes, sizeof=estimate_size):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+
+        # Dihitung di luar lock supaya session lain tidak ikut menunggu
+        value = compute()
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return value
+
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self.entries:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'cache': self.name,
+                'entries': len(self.entries),
+                'memory_mb': round(self.total_bytes / 1024 ** 2, 2),
+                'budget_mb': round(self.max_bytes / 1024 ** 2, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / requests, 3) if requests else 0.0,
+                'evictions': self.evictions,
+            }
+
+
+kpi_cache = MemoCache('kpi', int(KPI_CACHE_MB * 1024 ** 2))
+
+
+def memoized(version, page, name, filters, compute, cache=kpi_cache):
+    """Hasil compute() untuk (versi dataset, halaman, blok, filter); dihitung sekali per key."""
+    return cache.get((version, page, name, filters), compute)
+
+
+# Cache figure Plotly per (versi dataset, halaman, chart, filter). Figure
+# dibangun sekali lalu dipakai ulang oleh semua session; jangan diubah lagi
+# (update_layout dsb.) setelah keluar dari build().
+# Entri disimpan sebagai (figure, ukuran JSON) supaya tidak diserialisasi dua kali.
+figure_cache = MemoCache('figure', int(FIGURE_CACHE_MB * 1024 ** 2), sizeof=lambda entry: entry[1])
+
+_timing_lock = threading.Lock()
+_figure_timings = {}
+
+
+def _record_figure_timing(chart, build_seconds, serialize_seconds, size):
+    with _timing_lock:
+        timing = _figure_timings.setdefault(chart, {
+            'builds': 0,
+            'build_seconds_total': 0.0,
+            'build_seconds_max': 0.0,
+            'serialize_seconds_total': 0.0,
+            'serialize_seconds_max': 0.0,
+            'bytes': 0,
+        })
+        timing['builds'] += 1
+        timing['build_seconds_total'] += build_seconds
+        timing['build_seconds_max'] = max(timing['build_seconds_max'], build_seconds)
+        timing['serialize_seconds_total'] += serialize_seconds
+        timing['serialize_seconds_max'] = max(timing['serialize_seconds_max'], serialize_seconds)
+        timing['bytes'] = size
+
+
+def cached_figure_entry(version, page, chart, filters, build):
+    """(figure, ukuran JSON dalam byte) dari build() untuk (versi dataset, halaman,
+    chart, filter); waktu build dan serialisasi dicatat saat figure dibangun."""
+    def compute():
+        started = time.perf_counter()
+        fig = build()
+        built = time.perf_counter()
+        size = len(fig.to_json())
+        serialized = time.perf_counter()
+        _record_figure_timing(f'{page}.{chart}', built - started, serialized - built, size)
+        return fig, size
+
+    return figure_cache.get((version, page, chart, filters), compute)
+
+
+def cached_figure(version, page, chart, filters, build):
+    return cached_figure_entry(version, page, chart, filters, build)[0]
+
+
+def figure_timings():
+    """Ringkasan waktu build/serialisasi per chart (hanya saat cache miss)."""
+    with _timing_lock:
+        report = []
+        for chart, timing in sorted(_figure_timings.items()):
+            builds = timing['builds']
+            report.append({
+                'chart': chart,
+                'builds': builds,
+                'build_ms_avg': round(timing['build_seconds_total'] / builds * 1000, 2),
+                'build_ms_max': round(timing['build_seconds_max'] * 1000, 2),
+                'serialize_ms_avg': round(timing['serialize_seconds_total'] / builds * 1000, 2),
+                'serialize_ms_max': round(timing['serialize_seconds_max'] * 1000, 2),
+                'kb': round(timing['bytes'] / 1024, 1),
+            })
+        return report
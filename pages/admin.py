@@ -0,0 +1,53 @@
+import os
+
+import streamlit as st
+import pandas as pd
+
+import data_store
+import instrumentation
+from database import pool_metrics
+from memo import figure_cache, figure_timings, kpi_cache
+
+# Halaman admin tersembunyi: latensi per section (p50/p95), pool koneksi,
+# memori dataset dan statistik cache. Dibuka lewat /admin?token=<DASHBOARD_ADMIN_TOKEN>;
+# tanpa token yang cocok halaman tidak menampilkan apa pun.
+
+ADMIN_TOKEN = os.environ.get('DASHBOARD_ADMIN_TOKEN')
+
+st.set_page_config(page_title="Admin Dashboard", layout="wide")
+with open('styles.css') as f:
+    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+
+if not ADMIN_TOKEN or st.query_params.get('token') != ADMIN_TOKEN:
+    st.error("Halaman tidak ditemukan")
+    st.stop()
+
+st.markdown("## Latensi per Section")
+sections = pd.DataFrame(instrumentation.section_report())
+if sections.empty:
+    st.info("Belum ada section yang tercatat. Buka halaman dashboard terlebih dahulu.")
+else:
+    pages = ['Semua'] + sorted(sections['page'].unique())
+    selected_page = st.selectbox("Halaman", pages)
+    if selected_page != 'Semua':
+        sections = sections[sections['page'] == selected_page]
+    st.dataframe(sections.sort_values('p95_ms', ascending=False), use_container_width=True)
+
+if instrumentation.METRICS_PORT:
+    st.caption(f"Metrik Prometheus: http://<host>:{instrumentation.METRICS_PORT}/metrics")
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.markdown("### Pool Koneksi Database")
+    st.json(pool_metrics())
+
+    st.markdown("### Cache")
+    st.dataframe(pd.DataFrame([kpi_cache.stats(), figure_cache.stats()]), use_container_width=True)
+
+with col2:
+    st.markdown("### Memori Dataset")
+    st.dataframe(pd.DataFrame(data_store.memory_report()), use_container_width=True)
+
+    st.markdown("### Build Figure")
+    st.dataframe(pd.DataFrame(figure_timings()), use_container_width=True)
@@ -1,17 +1,28 @@
+import profiling
+# Dipasang sebelum import lain supaya waktu import halaman ikut terukur (DASHBOARD_PROFILE=1)
+timer = profiling.page_timer('analitik')
+
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-# Pastikan data sudah ada dalam session state
-if 'data' not in st.session_state:
-    st.error("Data belum dimuat! Silakan login terlebih dahulu.")
+import analytics
+import instrumentation
+from customer_activity import load_customer_activity
+from data_store import get_versioned_dataset
+from memo import cached_figure_entry, estimate_size, filter_key, memoized
+
+# Dataset bersama (read-only) untuk semua session
+try:
+    version, main_data = get_versioned_dataset()
+except Exception as e:
+    st.error(f"Data belum dimuat! {e}")
     st.stop()
 
-main_data = st.session_state['data']
+timer.lap('data')
+
 # Konfigurasi halaman
 st.set_page_config(
     page_title="Dashboard Penjualan Carrefour",
@@ -22,9 +33,6 @@ with open('styles.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
 
-# Convert date columns
-main_data['full_date'] = pd.to_datetime(main_data['full_date'])
-
 
 st.sidebar.markdown("## 🔍 Filter Data")
 
@@ -41,61 +49,39 @@ selected_segment = st.sidebar.selectbox("Pilih Segment", segments)
 # ================================
 # Filter Data Saat Ini
 # ================================
-filtered_data = main_data.copy()
-
-if len(date_range) == 2:
-    start_date = pd.to_datetime(date_range[0])
-    end_date = pd.to_datetime(date_range[1])
-    filtered_data = filtered_data[
-        (filtered_data['full_date'] >= start_date) &
-        (filtered_data['full_date'] <= end_date)
-    ]
-
-if selected_segment != 'Semua':
-    filtered_data = filtered_data[filtered_data['segment'] == selected_segment]
+spec = analytics.FilterSpec.from_date_range(date_range, segment=selected_segment)
+filtered_data = spec.apply(main_data)
 
 # ================================
 # Data Minggu Sebelumnya
 # ================================
-delta = end_date - start_date
-previous_start = start_date - delta - timedelta(days=1)
-previous_end = start_date - timedelta(days=1)
+previous_spec = spec.previous_period()
+if previous_spec is not None:
+    previous_data = previous_spec.apply(main_data)
+else:
+    previous_data = main_data.iloc[0:0]
 
-previous_data = main_data[
-    (main_data['full_date'] >= previous_start) &
-    (main_data['full_date'] <= previous_end)
-]
-
-if selected_segment != 'Semua':
-    previous_data = previous_data[previous_data['segment'] == selected_segment]
+timer.lap('filter')
 
 # ================================
 # KPI Functions
 # ================================
-def calculate_conversion_rate(data):
-    unique_customers = data['customer_id'].nunique()
-    customer_frequency = data.groupby('customer_id')['order_id'].nunique()
-    avg_frequency = customer_frequency.mean()
-    estimated_visitors = unique_customers * (avg_frequency + 2)
-    if estimated_visitors == 0:
-        return 0
-    return min((unique_customers / estimated_visitors) * 100, 100)
-
-def calculate_churn_rate(data):
-    if data.empty:
-        return 0
-    max_date = data['full_date'].max()
-    churn_threshold = max_date - timedelta(days=90)
-    last_tx = data.groupby('customer_id')['full_date'].max()
-    churned = last_tx[last_tx < churn_threshold]
-    if len(last_tx) == 0:
-        return 0
-    return (len(churned) / len(last_tx)) * 100
-
-def calculate_change(current, previous):
-    if previous == 0:
-        return 0
-    return ((current - previous) / previous) * 100
+# Hasil KPI/chart di-cache per (versi dataset, filter) dan dibagi antar session
+filters = spec.key()
+
+def cached(name, compute, key=filters, rows=None):
+    with instrumentation.section('analitik', name) as section:
+        result = memoized(version, 'analitik', name, key, compute)
+        section.rows = len(filtered_data) if rows is None else rows
+        section.payload_bytes = estimate_size(result)
+    return result
+
+def plot(name, build, key=filters):
+    with instrumentation.section('analitik', f'figure.{name}') as section:
+        fig, section.payload_bytes = cached_figure_entry(version, 'analitik', name, key, build)
+        st.plotly_chart(fig, use_container_width=True)
+
+calculate_change = analytics.calculate_change
 
 def format_change(val):
     arrow = "⬆️" if val > 0 else "⬇️" if val < 0 else "➡️"
@@ -104,15 +90,31 @@ def format_change(val):
 # ================================
 # KPI Perhitungan Saat Ini dan Minggu Sebelumnya
 # ================================
-avg_discount = filtered_data['discount'].mean() * 100
-conversion_rate = calculate_conversion_rate(filtered_data)
-customer_lifetime_value = filtered_data.groupby('customer_id')['sales'].sum().mean()
-churn_rate = calculate_churn_rate(filtered_data)
+# Ringkasan per customer (satu groupby per periode); KPI customer, detail metrics
+# dan histogram frekuensi semuanya diturunkan dari tabel ini
+customers = cached('customers', lambda: analytics.customer_summary(filtered_data))
+previous_customers = cached(
+    'customers_previous',
+    lambda: analytics.customer_summary(previous_data),
+    rows=len(previous_data)
+)
+
+current_kpis = cached('kpi', lambda: analytics.analytics_kpis(filtered_data, customers=customers))
+previous_kpis = cached(
+    'kpi_previous',
+    lambda: analytics.analytics_kpis(previous_data, customers=previous_customers),
+    rows=len(previous_data)
+)
 
-prev_avg_discount = previous_data['discount'].mean() * 100
-prev_conversion_rate = calculate_conversion_rate(previous_data)
-prev_customer_ltv = previous_data.groupby('customer_id')['sales'].sum().mean()
-prev_churn_rate = calculate_churn_rate(previous_data)
+avg_discount = current_kpis['avg_discount']
+conversion_rate = current_kpis['conversion_rate']
+customer_lifetime_value = current_kpis['customer_ltv']
+churn_rate = current_kpis['churn_rate']
+
+prev_avg_discount = previous_kpis['avg_discount']
+prev_conversion_rate = previous_kpis['conversion_rate']
+prev_customer_ltv = previous_kpis['customer_ltv']
+prev_churn_rate = previous_kpis['churn_rate']
 
 # Perubahan KPI (%)
 discount_change = calculate_change(avg_discount, prev_avg_discount)
@@ -167,26 +169,25 @@ with col4:
 with st.expander("Detail Metrics"):
     col1, col2, col3 = st.columns(3)
     
+    detail = cached('detail', lambda: analytics.detail_metrics(filtered_data, customers=customers))
+
     with col1:
-        st.metric("Total Customers", filtered_data['customer_id'].nunique())
-        st.metric("Total Orders", filtered_data['order_id'].nunique())
+        st.metric("Total Customers", detail['total_customers'])
+        st.metric("Total Orders", detail['total_orders'])
     
     with col2:
         # Customer frequency analysis
-        customer_freq = filtered_data.groupby('customer_id')['order_id'].nunique()
-        st.metric("Avg Order Frequency", f"{customer_freq.mean():.1f}")
-        st.metric("Repeat Customers", f"{(customer_freq > 1).sum()}")
+        st.metric("Avg Order Frequency", f"{detail['avg_frequency']:.1f}")
+        st.metric("Repeat Customers", f"{detail['repeat_customers']}")
     
     with col3:
         # Time-based metrics
-        date_range = (filtered_data['full_date'].max() - filtered_data['full_date'].min()).days
-        st.metric("Data Period (Days)", date_range)
+        st.metric("Data Period (Days)", detail['period_days'])
         
         # Active customers (transaksi dalam 30 hari terakhir)
-        max_date = filtered_data['full_date'].max()
-        active_threshold = max_date - timedelta(days=30)
-        active_customers = filtered_data[filtered_data['full_date'] >= active_threshold]['customer_id'].nunique()
-        st.metric("Active Customers (30d)", active_customers)
+        st.metric("Active Customers (30d)", detail['active_customers'])
+
+timer.lap('kpi')
 
 # Charts
 col1, col2 = st.columns(2)
@@ -194,123 +195,174 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown("### Efektivitas Diskon")
 
-    # Buat bins untuk diskon
-    main_data['discount_range'] = pd.cut(
-        main_data['discount'], 
-        bins=[0, 0.1, 0.2, 0.3, 0.4, 0.5, 1.0],
-        labels=['0-10%', '10-20%', '20-30%', '30-40%', '40-50%', '50%+']
+    # Batas bin (%) bisa diatur; agregat per bin dihitung dari kode level diskon
+    # pada data yang sudah difilter, jadi tidak ada pd.cut per rerun
+    discount_edges = st.multiselect(
+        "Batas Range Diskon (%)",
+        options=list(range(0, 105, 5)),
+        default=[int(edge * 100) for edge in analytics.DISCOUNT_BINS]
     )
-
-    # Aggregate data per bin
-    discount_analysis = main_data.groupby('discount_range').agg({
-        'sales': ['sum', 'mean'],
-        'profit': ['sum', 'mean'],
-        'quantity': 'sum',
-        'order_id': 'count'
-    }).round(2)
-
-    # Flatten column names
-    discount_analysis.columns = ['total_sales', 'avg_sales', 'total_profit', 'avg_profit', 'total_qty', 'total_orders']
-    discount_analysis = discount_analysis.reset_index()
-
-    # Create Bar Chart Binned
-    fig_discount = go.Figure()
-
-    # Add bars untuk total sales
-    fig_discount.add_trace(go.Bar(
-        x=discount_analysis['discount_range'],
-        y=discount_analysis['total_sales'],
-        name='Total Sales',
-        marker_color='#1e3c72',
-        yaxis='y'
-    ))
-
-    # Add line untuk profit margin
-    profit_margin = (discount_analysis['total_profit'] / discount_analysis['total_sales'] * 100)
-    fig_discount.add_trace(go.Scatter(
-        x=discount_analysis['discount_range'],
-        y=profit_margin,
-        mode='lines+markers',
-        name='Profit Margin (%)',
-        line=dict(color='#ffd700', width=3),
-        yaxis='y2'
-    ))
-
-    # Update layout untuk dual axis
-    fig_discount.update_layout(
-       
-        xaxis_title="Range Diskon",
-        yaxis=dict(title="Total Sales ($)", side="left"),
-        yaxis2=dict(title="Profit Margin (%)", side="right", overlaying="y"),
-        legend=dict(x=0.7, y=1.3)
+    discount_edges = sorted(discount_edges)
+    if len(discount_edges) < 2:
+        st.warning("Pilih minimal dua batas range diskon.")
+        discount_edges = [int(edge * 100) for edge in analytics.DISCOUNT_BINS]
+    edges = [edge / 100 for edge in discount_edges]
+    discount_key = filters + (('discount_edges', tuple(discount_edges)),)
+
+    discount_analysis = cached(
+        'discount',
+        lambda: analytics.discount_effectiveness(filtered_data, edges=edges),
+        key=discount_key
     )
 
-    fig_discount.update_layout(height=400, template='plotly_white')
-    st.plotly_chart(fig_discount, use_container_width=True)
+    # Create Bar Chart Binned
+    def build_discount():
+        fig_discount = go.Figure()
+
+        # Add bars untuk total sales
+        fig_discount.add_trace(go.Bar(
+            x=discount_analysis['discount_range'],
+            y=discount_analysis['total_sales'],
+            name='Total Sales',
+            marker_color='#1e3c72',
+            yaxis='y'
+        ))
+
+        # Add line untuk profit margin
+        fig_discount.add_trace(go.Scatter(
+            x=discount_analysis['discount_range'],
+            y=discount_analysis['profit_margin'],
+            mode='lines+markers',
+            name='Profit Margin (%)',
+            line=dict(color='#ffd700', width=3),
+            yaxis='y2'
+        ))
+
+        # Update layout untuk dual axis
+        fig_discount.update_layout(
+
+            xaxis_title="Range Diskon",
+            yaxis=dict(title="Total Sales ($)", side="left"),
+            yaxis2=dict(title="Profit Margin (%)", side="right", overlaying="y"),
+            legend=dict(x=0.7, y=1.3)
+        )
+
+        fig_discount.update_layout(height=400, template='plotly_white')
+        return fig_discount
+
+    plot('discount', build_discount, key=discount_key)
 
 with col2:
     st.markdown("### Segmentasi Pelanggan")
     
-    segment_data = filtered_data.groupby('segment').agg({
-        'sales': 'sum',
-        'customer_id': 'nunique'
-    }).reset_index()
+    segment_data = cached('segment', lambda: analytics.segment_summary(filtered_data))
     
-    fig_segment = px.pie(
-        segment_data,
-        values='sales',
-        names='segment',
-        color_discrete_sequence=['#1e3c72', '#ffd700', '#4a90e2']
-    )
-    fig_segment.update_layout(height=400)
-    st.plotly_chart(fig_segment, use_container_width=True)
+    def build_segment():
+        fig_segment = px.pie(
+            segment_data,
+            values='sales',
+            names='segment',
+            color_discrete_sequence=['#1e3c72', '#ffd700', '#4a90e2']
+        )
+        fig_segment.update_layout(height=400)
+        return fig_segment
+
+    plot('segment', build_segment)
     st.markdown('</div>', unsafe_allow_html=True)
 
+timer.lap('discount_segment')
+
 # Additional analytics
 col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("### Pola Musiman")
     
-    seasonal_data = filtered_data.groupby(filtered_data['full_date'].dt.month).agg({
-        'sales': 'sum',
-        'quantity': 'sum'
-    }).reset_index()
-    seasonal_data['month_name'] = seasonal_data['full_date'].apply(
-        lambda x: ['Jan', 'Feb', 'Mar', 'Apr', 'Mei', 'Jun', 
-                  'Jul', 'Agu', 'Sep', 'Okt', 'Nov', 'Des'][x-1]
-    )
+    seasonal_data = cached('seasonal', lambda: analytics.seasonal_pattern(filtered_data))
     
-    fig_seasonal = px.line(
-        seasonal_data,
-        x='month_name',
-        y=['sales', 'quantity'],
-        color_discrete_map={'sales': '#1e3c72', 'quantity': '#ffd700'}
-    )
-    fig_seasonal.update_layout(height=350, template='plotly_white')
-    st.plotly_chart(fig_seasonal, use_container_width=True)
+    def build_seasonal():
+        fig_seasonal = px.line(
+            seasonal_data,
+            x='month_name',
+            y=['sales', 'quantity'],
+            color_discrete_map={'sales': '#1e3c72', 'quantity': '#ffd700'}
+        )
+        fig_seasonal.update_layout(height=350, template='plotly_white')
+        return fig_seasonal
+
+    plot('seasonal', build_seasonal)
     st.markdown('</div>', unsafe_allow_html=True)
 
 with col2:
     st.markdown("### Frekuensi Pembelian")
     
     # Histogram frekuensi pembelian per customer
-    customer_frequency = filtered_data.groupby('customer_id')['order_id'].nunique().reset_index()
-    customer_frequency.columns = ['customer_id', 'frequency']
+    customer_frequency = cached('frequency', lambda: analytics.purchase_frequency(filtered_data, customers=customers))
     
-    fig_frequency = px.histogram(
-        customer_frequency,
-        x='frequency',
-        nbins=20,
-        color_discrete_sequence=['#1e3c72']
-    )
-    fig_frequency.update_layout(
-        height=350,
-        template='plotly_white',
-        xaxis_title="Frekuensi Pembelian",
-        yaxis_title="Jumlah Customer"
-    )
-    st.plotly_chart(fig_frequency, use_container_width=True)
+    def build_frequency():
+        fig_frequency = px.histogram(
+            customer_frequency,
+            x='frequency',
+            nbins=20,
+            color_discrete_sequence=['#1e3c72']
+        )
+        fig_frequency.update_layout(
+            height=350,
+            template='plotly_white',
+            xaxis_title="Frekuensi Pembelian",
+            yaxis_title="Jumlah Customer"
+        )
+        return fig_frequency
+
+    plot('frequency', build_frequency)
     st.markdown('</div>', unsafe_allow_html=True)
 
+timer.lap('seasonal_frequency')
+
+# ================================
+# Aktivitas Pelanggan (RFM)
+# ================================
+# Dibaca dari tabel customer_activity yang dipelihara ETL (satu baris per customer);
+# bila tabel belum ada, dihitung dari dataset bersama sebagai fallback
+st.markdown("### Aktivitas Pelanggan (RFM)")
+
+segment_key = filter_key(segment=selected_segment)
+
+def lifetime_customers():
+    activity = load_customer_activity()
+    if activity is None:
+        activity = analytics.lifetime_activity(main_data)
+    if selected_segment != 'Semua':
+        activity = activity[activity['segment'] == selected_segment]
+    return activity
+
+activity = cached('customer_activity', lifetime_customers, key=segment_key, rows=0)
+rfm = cached('rfm', lambda: analytics.rfm_segments(activity), key=segment_key, rows=len(activity))
 
+col1, col2 = st.columns([1, 2])
+
+with col1:
+    st.metric("Total Customers (lifetime)", f"{len(activity):,}")
+    st.metric("Churn Rate (lifetime)", f"{analytics.churn_rate(activity):.1f}%")
+
+with col2:
+    def build_rfm():
+        fig_rfm = px.bar(
+            rfm,
+            x='rfm_segment',
+            y='customers',
+            hover_data=['sales', 'avg_recency_days'],
+            color_discrete_sequence=['#1e3c72']
+        )
+        fig_rfm.update_layout(
+            height=350,
+            template='plotly_white',
+            xaxis_title="Segmen RFM",
+            yaxis_title="Jumlah Customer"
+        )
+        return fig_rfm
+
+    plot('rfm', build_rfm, key=segment_key)
+
+timer.lap('customer_activity')
+timer.finish()
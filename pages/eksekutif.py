@@ -1,20 +1,27 @@
+import profiling
+# Dipasang sebelum import lain supaya waktu import halaman ikut terukur (DASHBOARD_PROFILE=1)
+timer = profiling.page_timer('eksekutif')
+
 import streamlit as st
-import pandas as pd
-import psycopg2
 import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
-from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-# Pastikan data sudah ada dalam session state
-if 'data' not in st.session_state:
-    st.error("Data belum dimuat! Silakan login terlebih dahulu.")
+import analytics
+import instrumentation
+import rollup
+from data_store import get_versioned_dataset
+from memo import cached_figure_entry, estimate_size, memoized
+
+# Dataset bersama (read-only) untuk semua session
+try:
+    version, main_data = get_versioned_dataset()
+except Exception as e:
+    st.error(f"Data belum dimuat! {e}")
     st.stop()
 
-main_data = st.session_state['data']
+timer.lap('data')
+
 # Konfigurasi halaman
 st.set_page_config(
     page_title="Dashboard Penjualan Carrefour",
@@ -25,9 +32,6 @@ with open('styles.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
 
-# Convert date columns
-main_data['full_date'] = pd.to_datetime(main_data['full_date'])
-
 
 # Filters
 st.sidebar.markdown("## 🔍 Filter Data")
@@ -51,68 +55,76 @@ selected_segment = st.sidebar.selectbox("Pilih Segment Customer", segments)
 # -------------------------------
 # Apply Filter
 # -------------------------------
-filtered_data = main_data.copy()
-
-if len(date_range) == 2:
-    start_date = pd.to_datetime(date_range[0])
-    end_date = pd.to_datetime(date_range[1])
-    filtered_data = filtered_data[
-        (filtered_data['full_date'] >= start_date) &
-        (filtered_data['full_date'] <= end_date)
-    ]
-
-    # Data minggu sebelumnya
-    delta = end_date - start_date
-    prev_start = start_date - delta - timedelta(days=1)
-    prev_end = start_date - timedelta(days=1)
-    previous_data = main_data[
-        (main_data['full_date'] >= prev_start) &
-        (main_data['full_date'] <= prev_end)
-    ]
+spec = analytics.FilterSpec.from_date_range(
+    date_range,
+    region=selected_region,
+    category=selected_category,
+    segment=selected_segment
+)
+filtered_data = spec.apply(main_data)
+
+# Data periode sebelumnya (panjang sama dengan rentang terpilih)
+previous_spec = spec.previous_period()
+if previous_spec is not None:
+    previous_data = previous_spec.apply(main_data)
 else:
-    previous_data = pd.DataFrame()  # Empty fallback
+    previous_data = main_data.iloc[0:0]  # Empty fallback
+
+# Hasil KPI/chart di-cache per (versi dataset, filter) dan dibagi antar session
+filters = spec.key()
 
-if selected_region != 'Semua':
-    filtered_data = filtered_data[filtered_data['region'] == selected_region]
-    previous_data = previous_data[previous_data['region'] == selected_region]
+def cached(name, compute, key=filters, rows=None):
+    with instrumentation.section('eksekutif', name) as section:
+        result = memoized(version, 'eksekutif', name, key, compute)
+        section.rows = len(filtered_data) if rows is None else rows
+        section.payload_bytes = estimate_size(result)
+    return result
 
-if selected_category != 'Semua':
-    filtered_data = filtered_data[filtered_data['category'] == selected_category]
-    previous_data = previous_data[previous_data['category'] == selected_category]
+def plot(name, build, key=filters):
+    with instrumentation.section('eksekutif', f'figure.{name}') as section:
+        fig, section.payload_bytes = cached_figure_entry(version, 'eksekutif', name, key, build)
+        st.plotly_chart(fig, use_container_width=True)
+
+def monthly_summary():
+    # Rollup bulanan dipakai bila rentang tanggal pas per bulan
+    monthly = rollup.monthly_sales(**spec.rollup_filters())
+    return monthly if monthly is not None else analytics.monthly_sales(filtered_data)
+
+def region_summary():
+    summary = rollup.region_summary(**spec.rollup_filters())
+    return summary if summary is not None else analytics.region_summary(filtered_data)
 
-if selected_segment != 'Semua':
-    filtered_data = filtered_data[filtered_data['segment'] == selected_segment]
-    previous_data = previous_data[previous_data['segment'] == selected_segment]
+def state_summary():
+    summary = rollup.state_summary(**spec.rollup_filters())
+    if summary is None:
+        summary = analytics.state_summary(filtered_data)
+    return analytics.state_margin(summary)
+
+timer.lap('filter')
 
 # -------------------------------
 # KPI Calculation
 # -------------------------------
-def calculate_change(current, previous):
-    if previous == 0:
-        return 0
-    return ((current - previous) / previous) * 100
+calculate_change = analytics.calculate_change
 
 def format_change(change):
     arrow = "⬆️" if change > 0 else "⬇️" if change < 0 else "➡️"
     return f"{arrow} {abs(change):.1f}%"
 
-# Current KPIs
-total_sales = filtered_data['sales'].sum()
-total_transactions = filtered_data['order_id'].nunique()
-total_profit = filtered_data['profit'].sum()
-avg_order_value = total_sales / total_transactions if total_transactions > 0 else 0
+current_kpis = cached('kpi', lambda: analytics.executive_kpis(filtered_data))
+previous_kpis = cached('kpi_previous', lambda: analytics.executive_kpis(previous_data), rows=len(previous_data))
 
-# Previous KPIs
-prev_sales = previous_data['sales'].sum()
-prev_transactions = previous_data['order_id'].nunique()
-prev_profit = previous_data['profit'].sum()
-prev_avg_order = prev_sales / prev_transactions if prev_transactions > 0 else 0
+# Current KPIs
+total_sales = current_kpis['total_sales']
+total_transactions = current_kpis['total_transactions']
+total_profit = current_kpis['total_profit']
+avg_order_value = current_kpis['avg_order_value']
 
 # Changes
-sales_change = calculate_change(total_sales, prev_sales)
-transactions_change = calculate_change(total_transactions, prev_transactions)
-profit_change = calculate_change(total_profit, prev_profit)
-aov_change = calculate_change(avg_order_value, prev_avg_order)
+sales_change = calculate_change(total_sales, previous_kpis['total_sales'])
+transactions_change = calculate_change(total_transactions, previous_kpis['total_transactions'])
+profit_change = calculate_change(total_profit, previous_kpis['total_profit'])
+aov_change = calculate_change(avg_order_value, previous_kpis['avg_order_value'])
 
 # -------------------------------
 # Tampilkan KPI
@@ -157,29 +169,30 @@ with col4:
     </div>
     """, unsafe_allow_html=True)
 
+timer.lap('kpi')
+
 col1, col2 = st.columns(2)
 
 with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown("### Tren Penjualan")
-        # Kelompokkan per bulan (atau bisa diganti harian/mingguan)
-        monthly_growth = filtered_data.groupby(filtered_data['full_date'].dt.to_period('M')).agg({
-            'sales': 'sum'
-        }).reset_index()
-
-        monthly_growth['full_date'] = monthly_growth['full_date'].dt.to_timestamp()
-
-        fig_growth = px.line(
-            monthly_growth,
-            x='full_date',
-            y='sales',
-            markers=True,
-            labels={'full_date': 'Tanggal', 'sales': 'Total Penjualan'},
-            color_discrete_sequence=['#1e3c72']
-        )
+        # Kelompokkan per bulan (dari rollup bila rentang tanggal pas per bulan)
+        monthly_growth = cached('monthly', monthly_summary)
+
+        def build_monthly():
+            fig_growth = px.line(
+                monthly_growth,
+                x='full_date',
+                y='sales',
+                markers=True,
+                labels={'full_date': 'Tanggal', 'sales': 'Total Penjualan'},
+                color_discrete_sequence=['#1e3c72']
+            )
 
-        fig_growth.update_layout(height=400, template='plotly_white')
-        st.plotly_chart(fig_growth, use_container_width=True)
+            fig_growth.update_layout(height=400, template='plotly_white')
+            return fig_growth
+
+        plot('monthly', build_monthly)
 
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -188,43 +201,33 @@ with col2:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     st.markdown("### Profit Margin")
 
-    # Group data berdasarkan bulan dari kolom full_date
-    margin_data = filtered_data.copy()
-    margin_data['bulan'] = margin_data['full_date'].dt.to_period('M')
+    # Total sales, profit dan profit margin per bulan
+    margin_summary = cached('margin', lambda: analytics.profit_margin(cached('monthly', monthly_summary)))
 
-    # Hitung total sales dan profit per bulan
-    margin_summary = margin_data.groupby('bulan').agg({
-        'sales': 'sum',
-        'profit': 'sum'
-    }).reset_index()
+    # Visualisasi bar chart
+    def build_margin():
+        fig_margin_range = px.bar(
+            margin_summary,
+            x='bulan',
+            y='profit_margin',
+            color='profit_margin',
+            color_continuous_scale=[[0, '#1e3c72'], [1, '#ffd700']],
+            text='profit_margin'
+        )
 
-    # Hitung profit margin
-    margin_summary['profit_margin'] = (margin_summary['profit'] / margin_summary['sales']) * 100
-    margin_summary['profit_margin'] = margin_summary['profit_margin'].round(2)
+        fig_margin_range.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
+        fig_margin_range.update_layout(
+            height=400,
+            xaxis_title="Bulan",
+            yaxis_title="Profit Margin (%)",
+            template='plotly_white'
+        )
+        return fig_margin_range
 
-    # Ubah period ke timestamp agar bisa di-plot
-    margin_summary['bulan'] = margin_summary['bulan'].dt.to_timestamp()
+    plot('margin', build_margin)
 
-    # Visualisasi bar chart
-    fig_margin_range = px.bar(
-        margin_summary,
-        x='bulan',
-        y='profit_margin',
-        color='profit_margin',
-        color_continuous_scale=[[0, '#1e3c72'], [1, '#ffd700']],
-        text='profit_margin'
-    )
-
-    fig_margin_range.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-    fig_margin_range.update_layout(
-        height=400,
-        xaxis_title="Bulan",
-        yaxis_title="Profit Margin (%)",
-        template='plotly_white'
-    )
-
-    st.plotly_chart(fig_margin_range, use_container_width=True)
 
+timer.lap('trend_margin')
 
 # Row 2: Regional Performance
 
@@ -232,14 +235,10 @@ col3, col4 = st.columns(2)
 
 with col3:
     
-        summary_data = filtered_data.groupby('region').agg({
-            'sales': 'sum',
-            'profit': 'sum',
-            'quantity': 'sum',
-            'order_id': 'nunique',
-            'customer_id': 'nunique'
-        }).reset_index()
-        summary_data.columns = ['Region', 'Total Sales', 'Total Profit', 'Total Quantity', 'Total Orders', 'Unique Customers']
+        summary_data = cached('region', region_summary).set_axis(
+            ['Region', 'Total Sales', 'Total Profit', 'Total Quantity', 'Total Orders', 'Unique Customers'],
+            axis=1
+        )
 
         st.subheader("Penjualan per Wilayah (Ranking)")
 
@@ -247,28 +246,30 @@ with col3:
         summary_data_sorted = summary_data.sort_values(by='Total Sales', ascending=False)
 
        
-        fig = px.bar(
-            summary_data_sorted,
-            x='Total Sales',
-            y='Region',
-            orientation='h',
-            color='Region',
-            text='Total Sales',
-            labels={'Total Sales': 'Total Penjualan'},
-            height=500,
-            color_discrete_sequence=['#1f77b4', '#ffcc00']  # Biru dan kuning
-        )
+        def build_region():
+            fig = px.bar(
+                summary_data_sorted,
+                x='Total Sales',
+                y='Region',
+                orientation='h',
+                color='Region',
+                text='Total Sales',
+                labels={'Total Sales': 'Total Penjualan'},
+                height=500,
+                color_discrete_sequence=['#1f77b4', '#ffcc00']  # Biru dan kuning
+            )
 
-        fig.update_traces(
-            texttemplate='%{text:.2s}',
-            textposition='outside'
-        )
+            fig.update_traces(
+                texttemplate='%{text:.2s}',
+                textposition='outside'
+            )
 
-        fig.update_layout(
-            yaxis={'categoryorder': 'total ascending'}
-        )
+            fig.update_layout(
+                yaxis={'categoryorder': 'total ascending'}
+            )
+            return fig
 
-        st.plotly_chart(fig, use_container_width=True)
+        plot('region', build_region)
 
 
    
@@ -276,88 +277,72 @@ with col4:
     st.markdown("### Persebaran Penjualan per State (USA)")
     
     # Prepare data for US state-level choropleth
-    state_data = filtered_data[filtered_data['country'] == 'United States'].groupby('state').agg({
-        'sales': 'sum',
-        'profit': 'sum',
-        'customer_id': 'nunique',
-        'order_id': 'nunique'
-    }).reset_index()
+    state_data = cached('state', state_summary)
     
     if not state_data.empty:
-        state_data['profit_margin'] = (state_data['profit'] / state_data['sales'] * 100).round(2)
-        
-        # Dictionary untuk mapping nama state ke kode
-        state_code_map = {
-            'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
-            'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
-            'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
-            'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
-            'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
-            'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
-            'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
-            'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
-            'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
-            'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-            'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
-            'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
-            'Wisconsin': 'WI', 'Wyoming': 'WY', 'District of Columbia': 'DC'
-        }
-        
-        # Map state names to codes
-        state_data['state_code'] = state_data['state'].map(state_code_map)
+        # Map state names to codes (assign: hasil cache tidak diubah in-place)
+        state_data = analytics.with_state_codes(state_data)
         
         # Filter only states with valid codes
         valid_state_data = state_data[state_data['state_code'].notna()]
         
         if not valid_state_data.empty:
             # Create US state choropleth map
-            fig_usa = px.choropleth(
-                valid_state_data,
-                locations='state_code',
-                color='sales',
-                hover_name='state',
-                hover_data={
-                    'sales': ':$,.0f',
-                    'customer_id': ':,',
-                    'order_id': ':,',
-                    'profit_margin': ':.1f%',
-                    'state_code': False
-                },
-                color_continuous_scale=[[0, '#1e3c72'], [1, '#ffd700']],
-                locationmode='USA-states'
-            )
-            
-            fig_usa.update_layout(
-                height=400,
-                geo_scope='usa',
-                geo=dict(
-                    showlakes=True,
-                    lakecolor='rgb(255, 255, 255)'
+            def build_state_map():
+                fig_usa = px.choropleth(
+                    valid_state_data,
+                    locations='state_code',
+                    color='sales',
+                    hover_name='state',
+                    hover_data={
+                        'sales': ':$,.0f',
+                        'customer_id': ':,',
+                        'order_id': ':,',
+                        'profit_margin': ':.1f%',
+                        'state_code': False
+                    },
+                    color_continuous_scale=[[0, '#1e3c72'], [1, '#ffd700']],
+                    locationmode='USA-states'
                 )
-            )
-            
-            st.plotly_chart(fig_usa, use_container_width=True)
+
+                fig_usa.update_layout(
+                    height=400,
+                    geo_scope='usa',
+                    geo=dict(
+                        showlakes=True,
+                        lakecolor='rgb(255, 255, 255)'
+                    )
+                )
+                return fig_usa
+
+            plot('state_map', build_state_map)
         else:
             st.warning("Choropleth map tidak dapat ditampilkan, menampilkan bar chart sebagai alternatif")
             
             top_states = state_data.sort_values('sales', ascending=False).head(15)
             
-            fig_bar = px.bar(
-                top_states,
-                x='sales',
-                y='state',
-                orientation='h',
-                title="Top 15 States - Total Penjualan",
-                color='sales',
-                color_continuous_scale='Reds'
-            )
-            fig_bar.update_layout(
-                height=400,
-                yaxis={'categoryorder': 'total ascending'}
-            )
-            st.plotly_chart(fig_bar, use_container_width=True)
+            def build_state_bar():
+                fig_bar = px.bar(
+                    top_states,
+                    x='sales',
+                    y='state',
+                    orientation='h',
+                    title="Top 15 States - Total Penjualan",
+                    color='sales',
+                    color_continuous_scale='Reds'
+                )
+                fig_bar.update_layout(
+                    height=400,
+                    yaxis={'categoryorder': 'total ascending'}
+                )
+                return fig_bar
+
+            plot('state_bar', build_state_bar)
             
     else:
         st.info("Data US State tidak tersedia atau kosong")
 
-    st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown('</div>', unsafe_allow_html=True)
+
+timer.lap('region_state')
+timer.finish()
@@ -0,0 +1,121 @@
+import builtins
+import logging
+import os
+import sys
+import threading
+import time
+
+# Profiling cold start, aktif bila DASHBOARD_PROFILE=1:
+#   - laporan import ala `python -X importtime` (self / cumulative per modul),
+#     diukur lewat hook builtins.__import__ sejak profiling di-import;
+#   - waktu wall-clock per section halaman (PageTimer.lap).
+# Tanpa env var semua fungsi di sini menjadi no-op yang murah.
+#
+# Untuk laporan import lengkap sejak interpreter start, jalankan juga:
+#   PYTHONPROFILEIMPORTTIME=1 streamlit run app.py 2> importtime.log
+
+ENABLED = os.environ.get('DASHBOARD_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_original_import = builtins.__import__
+_import_times = {}
+_local = threading.local()
+_page_timings = {}
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0 and name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        cumulative = time.perf_counter() - started
+        children = stack.pop()
+        if stack:
+            stack[-1] += cumulative
+        # Hanya import yang benar-benar memuat modul baru yang dicatat
+        if level == 0 and name in sys.modules and name not in _import_times:
+            with _lock:
+                _import_times[name] = (cumulative - children, cumulative)
+
+
+def install_import_timer():
+    """Pasang hook import (sekali per proses); no-op bila profiling tidak aktif."""
+    if ENABLED and builtins.__import__ is not _timed_import:
+        builtins.__import__ = _timed_import
+
+
+def import_report(limit=30):
+    """Modul dengan waktu import kumulatif terbesar, dalam mikrodetik seperti -X importtime."""
+    with _lock:
+        items = sorted(_import_times.items(), key=lambda item: item[1][1], reverse=True)
+    return [
+        {'module': name, 'self_us': int(own * 1e6), 'cumulative_us': int(cumulative * 1e6)}
+        for name, (own, cumulative) in items[:limit]
+    ]
+
+
+class PageTimer:
+    """Waktu wall-clock per section satu kali render halaman."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.sections = []
+
+    def lap(self, section):
+        """Tutup section yang sedang berjalan (sejak lap sebelumnya).
+        Durasinya selalu dikirim ke instrumentation, profil detail hanya bila aktif."""
+        # Di-import di sini, bukan di atas, supaya tetap ikut terukur oleh hook import
+        import instrumentation
+
+        now = time.perf_counter()
+        seconds = now - self.last
+        self.last = now
+        instrumentation.record(self.page, f'stage.{section}', seconds)
+        if ENABLED:
+            self.sections.append((section, seconds))
+
+    def finish(self):
+        if not ENABLED:
+            return
+        total = time.perf_counter() - self.started
+        with _lock:
+            _page_timings[self.page] = {'total': total, 'sections': list(self.sections)}
+        logger.info(
+            "Render %s %.1f ms: %s", self.page, total * 1000,
+            ', '.join(f'{name}={seconds * 1000:.1f}ms' for name, seconds in self.sections)
+        )
+        show_report(self.page)
+
+
+def page_timer(page):
+    install_import_timer()
+    return PageTimer(page)
+
+
+def show_report(page):
+    """Expander di sidebar berisi waktu section halaman dan modul paling lama di-import."""
+    import pandas as pd
+    import streamlit as st
+
+    with _lock:
+        timing = _page_timings.get(page)
+    with st.sidebar.expander("⏱️ Profil halaman"):
+        if timing is not None:
+            st.caption(f"Total render: {timing['total'] * 1000:.1f} ms")
+            st.dataframe(pd.DataFrame(
+                [(name, round(seconds * 1000, 2)) for name, seconds in timing['sections']],
+                columns=['section', 'ms']
+            ))
+        st.caption("Import terlama (sejak profiling aktif)")
+        st.dataframe(pd.DataFrame(import_report()))
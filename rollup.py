@@ -0,0 +1,276 @@
+import argparse
+import logging
+import os
+import threading
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+import data_store
+import distinct
+from database import get_connection, get_engine
+
+# Rollup bulanan di grain (month x region x state x category x segment).
+# Halaman membaca beberapa ribu baris ini alih-alih seluruh fact_sales untuk
+# chart agregat (Tren Penjualan, Profit Margin, Penjualan per Wilayah, peta
+# state). customer_ids disimpan sebagai array supaya jumlah customer unik tetap
+# eksak saat beberapa sel digabung lintas bulan/region.
+#
+# Dengan DASHBOARD_ROLLUP_SKETCHES=1 (atau `python -m rollup --sketches`) tiap sel
+# juga menyimpan sketch HyperLogLog customer_ids (customer_hll). Halaman lalu
+# memuat sketch alih-alih array id dan jumlah customer unik menjadi estimasi
+# (galat ~1.6% di presisi default) dari gabungan register, bukan union set.
+
+CREATE_AGG_SALES_MONTHLY = """
+CREATE TABLE IF NOT EXISTS agg_sales_monthly (
+    month DATE NOT NULL,
+    country TEXT,
+    region TEXT,
+    state TEXT,
+    category TEXT,
+    segment TEXT,
+    sales NUMERIC,
+    profit NUMERIC,
+    quantity BIGINT,
+    order_count BIGINT,
+    customer_ids TEXT[],
+    first_date DATE,
+    last_date DATE,
+    customer_hll BYTEA
+);
+ALTER TABLE agg_sales_monthly ADD COLUMN IF NOT EXISTS customer_hll BYTEA;
+CREATE INDEX IF NOT EXISTS idx_agg_sales_monthly_month ON agg_sales_monthly (month);
+"""
+
+DELETE_MONTHS = """
+DELETE FROM agg_sales_monthly WHERE month = ANY(:months)
+"""
+
+INSERT_ROLLUP = """
+INSERT INTO agg_sales_monthly (
+    month, country, region, state, category, segment,
+    sales, profit, quantity, order_count, customer_ids, first_date, last_date
+)
+SELECT
+    DATE_TRUNC('month', dd.full_date)::date AS month,
+    dl.country, dl.region, dl.state, dp.category, dc.segment,
+    SUM(fs.sales), SUM(fs.profit), SUM(fs.quantity),
+    COUNT(DISTINCT fs.order_id),
+    ARRAY_AGG(DISTINCT fs.customer_id),
+    MIN(dd.full_date), MAX(dd.full_date)
+FROM fact_sales fs
+LEFT JOIN dim_customer dc ON fs.customer_id = dc.customer_id
+LEFT JOIN dim_location dl ON dc.location_key = dl.location_key
+LEFT JOIN dim_product dp ON fs.product_id = dp.product_id
+LEFT JOIN dim_date dd ON fs.order_date_key = dd.date_key
+{where}
+GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+SELECT_ROLLUP = """
+SELECT month, country, region, state, category, segment,
+       sales, profit, quantity, order_count, {customers}, first_date, last_date
+FROM agg_sales_monthly
+"""
+
+SELECT_CUSTOMER_IDS = """
+SELECT ctid::text AS row_ref, customer_ids FROM agg_sales_monthly {where}
+"""
+
+UPDATE_SKETCH = """
+UPDATE agg_sales_monthly SET customer_hll = :sketch WHERE ctid = CAST(:row_ref AS tid)
+"""
+
+HAS_SKETCHES = """
+SELECT EXISTS (SELECT 1 FROM agg_sales_monthly WHERE customer_hll IS NOT NULL)
+"""
+
+SKETCHES = os.environ.get('DASHBOARD_ROLLUP_SKETCHES', '').lower() in ('1', 'true', 'yes')
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_cache = {'version': None, 'frame': None}
+
+
+def create_rollup_tables(conn):
+    for statement in CREATE_AGG_SALES_MONTHLY.split(';'):
+        if statement.strip():
+            conn.execute(text(statement))
+
+
+def refresh_rollup(conn, months=None, sketches=SKETCHES):
+    """Bangun ulang rollup untuk bulan-bulan tertentu, atau seluruhnya bila months None."""
+    create_rollup_tables(conn)
+    if months is None:
+        conn.execute(text("TRUNCATE TABLE agg_sales_monthly"))
+        conn.execute(text(INSERT_ROLLUP.format(where="")))
+        if sketches:
+            refresh_sketches(conn)
+        return
+
+    months = sorted({pd.Timestamp(m).to_period('M').to_timestamp().date() for m in months})
+    if not months:
+        return
+    # Tabel yang sudah berisi sketch tetap dilengkapi sketch, supaya tidak ada
+    # campuran sel dengan dan tanpa customer_hll
+    sketches = sketches or _has_sketches(conn)
+    conn.execute(text(DELETE_MONTHS), {'months': months})
+    conn.execute(
+        text(INSERT_ROLLUP.format(where="WHERE DATE_TRUNC('month', dd.full_date)::date = ANY(:months)")),
+        {'months': months}
+    )
+    if sketches:
+        refresh_sketches(conn, months)
+
+
+def _has_sketches(conn):
+    return bool(conn.execute(text(HAS_SKETCHES)).scalar())
+
+
+def refresh_sketches(conn, months=None):
+    """Isi customer_hll dari customer_ids sel rollup (bulan tertentu atau semuanya)."""
+    if months is None:
+        rows = conn.execute(text(SELECT_CUSTOMER_IDS.format(where="")))
+    else:
+        rows = conn.execute(text(SELECT_CUSTOMER_IDS.format(where="WHERE month = ANY(:months)")), {'months': months})
+    updates = [
+        {'row_ref': row_ref, 'sketch': distinct.hll_to_bytes(distinct.hll_sketch(customer_ids or []))}
+        for row_ref, customer_ids in rows
+    ]
+    if updates:
+        conn.execute(text(UPDATE_SKETCH), updates)
+
+
+def load_rollup():
+    """Rollup di memori, dimuat ulang setiap kali versi dataset bersama berganti."""
+    version = data_store.get_version()
+    with _lock:
+        if _cache['version'] == version and version is not None:
+            return _cache['frame']
+        try:
+            frame = _read_rollup()
+        except SQLAlchemyError:
+            # Tabel rollup belum dibuat: halaman kembali ke perhitungan pandas
+            frame = None
+        _cache['version'] = version
+        _cache['frame'] = frame
+        return frame
+
+
+def _read_rollup():
+    with get_connection() as conn:
+        frame = pd.read_sql(SELECT_ROLLUP.format(customers='customer_hll' if SKETCHES else 'customer_ids'), conn)
+    if SKETCHES:
+        if frame['customer_hll'].isna().any():
+            # Sketch belum lengkap: halaman kembali ke perhitungan pandas
+            logger.warning("Rollup belum punya sketch customer_hll; jalankan `python -m rollup --sketches`")
+            return None
+        frame['customer_hll'] = frame['customer_hll'].map(distinct.hll_from_bytes)
+    frame['month'] = pd.to_datetime(frame['month'])
+    frame['first_date'] = pd.to_datetime(frame['first_date'])
+    frame['last_date'] = pd.to_datetime(frame['last_date'])
+    for col in ['sales', 'profit']:
+        frame[col] = frame[col].astype(float)
+    return frame
+
+
+def _select(region='Semua', category='Semua', segment='Semua', start_date=None, end_date=None):
+    frame = load_rollup()
+    if frame is None:
+        return None
+
+    mask = pd.Series(True, index=frame.index)
+    if region != 'Semua':
+        mask &= frame['region'] == region
+    if category != 'Semua':
+        mask &= frame['category'] == category
+    if segment != 'Semua':
+        mask &= frame['segment'] == segment
+
+    if start_date is not None and end_date is not None:
+        start_date = pd.Timestamp(start_date)
+        end_date = pd.Timestamp(end_date)
+        overlap = (frame['last_date'] >= start_date) & (frame['first_date'] <= end_date)
+        inside = (frame['first_date'] >= start_date) & (frame['last_date'] <= end_date)
+        # Rentang tanggal memotong di tengah bulan: rollup bulanan tidak bisa menjawab eksak
+        if (mask & overlap & ~inside).any():
+            return None
+        mask &= inside
+
+    return frame[mask]
+
+
+def _count_customers(customer_lists):
+    customers = set()
+    for ids in customer_lists:
+        customers.update(ids)
+    return len(customers)
+
+
+def _estimate_customers(sketches):
+    return distinct.hll_count(distinct.hll_merge(sketches))
+
+
+def _customer_count():
+    """Agregasi jumlah customer unik: union array id (eksak) atau gabungan sketch."""
+    if SKETCHES:
+        return ('customer_hll', _estimate_customers)
+    return ('customer_ids', _count_customers)
+
+
+def monthly_sales(**filters):
+    rows = _select(**filters)
+    if rows is None:
+        return None
+    return (
+        rows.groupby('month')[['sales', 'profit']]
+        .sum()
+        .reset_index()
+        .rename(columns={'month': 'full_date'})
+    )
+
+
+def region_summary(**filters):
+    rows = _select(**filters)
+    if rows is None:
+        return None
+    summary = rows.groupby('region').agg(
+        sales=('sales', 'sum'),
+        profit=('profit', 'sum'),
+        quantity=('quantity', 'sum'),
+        order_id=('order_count', 'sum'),
+        customer_id=_customer_count(),
+    ).reset_index()
+    return summary
+
+
+def state_summary(country='United States', **filters):
+    rows = _select(**filters)
+    if rows is None:
+        return None
+    rows = rows[rows['country'] == country]
+    summary = rows.groupby('state').agg(
+        sales=('sales', 'sum'),
+        profit=('profit', 'sum'),
+        customer_id=_customer_count(),
+        order_id=('order_count', 'sum'),
+    ).reset_index()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh rollup agg_sales_monthly")
+    parser.add_argument('--months', nargs='*', help="Bulan yang di-refresh (YYYY-MM); kosong = rebuild penuh")
+    parser.add_argument('--sketches', action='store_true', help="Bangun juga sketch HyperLogLog customer_hll")
+    args = parser.parse_args()
+
+    months = args.months or None
+    with get_engine().begin() as conn:
+        refresh_rollup(conn, months, sketches=args.sketches or SKETCHES)
+    print("Rollup agg_sales_monthly berhasil di-refresh")
+
+
+if __name__ == '__main__':
+    main()
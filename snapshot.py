@@ -0,0 +1,75 @@
+import os
+
+import pyarrow as pa
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_connection
+
+# Snapshot kolumnar (Arrow IPC) dari dataset hasil join, ditulis oleh ETL setelah
+# setiap load. File tidak dikompres supaya bisa di-memory-map: load_data() tidak
+# perlu menarik seluruh fact_sales lewat Postgres saat startup.
+
+SNAPSHOT_PATH = os.environ.get('DASHBOARD_SNAPSHOT_PATH', os.path.join('dataset', 'sales_snapshot.arrow'))
+
+# Kolom string berulang yang disimpan sebagai dictionary (jadi categorical di pandas)
+DICTIONARY_COLUMNS = ['region', 'category', 'segment', 'state', 'ship_mode', 'product_name']
+
+NUMERIC_COLUMNS = ['sales', 'profit', 'discount']
+
+WATERMARK_KEY = b'etl_watermark'
+
+
+def current_watermark():
+    """Waktu load ETL terakhir di database (string ISO), atau None bila belum ada."""
+    with get_connection() as conn:
+        value = conn.execute(text("SELECT MAX(loaded_at) FROM etl_watermark")).scalar()
+    return value.isoformat() if value is not None else None
+
+
+def write_snapshot(df, watermark, path=SNAPSHOT_PATH):
+    # Disimpan terurut per tanggal, sehingga load_data() tidak perlu sort ulang
+    df = df.sort_values('full_date', kind='stable', ignore_index=True)
+    for col in NUMERIC_COLUMNS:
+        df[col] = df[col].astype('float64')
+    for col in DICTIONARY_COLUMNS:
+        df[col] = df[col].astype('category')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[WATERMARK_KEY] = (watermark or '').encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Tulis ke file sementara lalu rename, supaya pembaca tidak melihat file setengah jadi
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(path=SNAPSHOT_PATH, check_watermark=True):
+    """Snapshot sebagai DataFrame bila masih sesuai watermark database, selain itu None.
+    check_watermark=False membaca snapshot tanpa menghubungi database (benchmark)."""
+    if not os.path.exists(path):
+        return None
+
+    source = pa.memory_map(path, 'r')
+    reader = pa.ipc.open_file(source)
+    if not check_watermark:
+        return reader.read_all().to_pandas()
+
+    metadata = reader.schema.metadata or {}
+    snapshot_watermark = metadata.get(WATERMARK_KEY, b'').decode() or None
+
+    try:
+        database_watermark = current_watermark()
+    except SQLAlchemyError:
+        # Watermark tidak bisa dicek (tabel belum ada / DB tidak terjangkau): pakai snapshot
+        database_watermark = snapshot_watermark
+
+    if snapshot_watermark is None or snapshot_watermark != database_watermark:
+        return None
+
+    return reader.read_all().to_pandas()